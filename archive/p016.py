@@ -3,7 +3,9 @@
 
 What is the sum of the digits of the number 2^1000?
 """
+from lib.numb import digits_iter
+
 power = 1000
 
-res = sum([int(d) for d in str(2**power)])
+res = sum(digits_iter(2**power))
 print(res)
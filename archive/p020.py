@@ -6,10 +6,12 @@ and the sum of the digits in the number 10! is 3 + 6 + 2 + 8 + 8 + 0 + 0 = 27.
 
 Find the sum of the digits in the number 100!
 """
+from lib.numb import digits_iter
+
 factorial_size = 100
 total = 0
 factorial = 1
 for i in range(1, factorial_size + 1):
     factorial *= i
 
-print("Sum of digits in {}! ({}): {}".format(factorial_size, factorial, sum(int(d) for d in str(factorial))))
+print("Sum of digits in {}! ({}): {}".format(factorial_size, factorial, sum(digits_iter(factorial))))
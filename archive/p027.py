@@ -17,29 +17,37 @@ Find the product of the coefficients, a and b, for the quadratic expression that
 """
 import time
 
-from lib.prime import is_prime, sieve_primes
+import numpy as np
+
+from lib.prime import is_prime_many, sieve_primes
 
 start_time = time.time()
 
 coefficient_limit = 1000
 
 
-def count_primes_from_quadratic(a, b):
+def count_primes_from_quadratics(a, b):
+    """Return array of the number of consecutive primes produced from n = 0 by n^2 + a n + b, for each of an array of a."""
+    counts = np.zeros(len(a), dtype=int)
+    alive = np.arange(len(a))
     n = 0
-    while is_prime(n ** 2 + a * n + b):
+    while len(alive):
+        alive = alive[is_prime_many(n ** 2 + a[alive] * n + b)]
+        counts[alive] += 1
         n += 1
-    return n
+    return counts
 
 
 best_ab = None
 seq_len = 0
 
+coefficients_a = np.arange(-coefficient_limit, coefficient_limit + 1)
 for b in sieve_primes(max_prime=coefficient_limit):
-    for a in range(-coefficient_limit, coefficient_limit + 1):
-        count = count_primes_from_quadratic(a, b)
-        if count > seq_len:
-            seq_len = count
-            best_ab = (a, b)
+    counts = count_primes_from_quadratics(coefficients_a, b)
+    i = counts.argmax()
+    if counts[i] > seq_len:
+        seq_len = int(counts[i])
+        best_ab = (int(coefficients_a[i]), b)
 
 print("Best pair is {}, {} (generated {} primes), giving: {}".format(*best_ab, seq_len, best_ab[0] * best_ab[1]))
 print("Execution time: {}".format(time.time() - start_time))
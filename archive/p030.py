@@ -12,6 +12,10 @@ Find the sum of all the numbers that can be written as the sum of fifth powers o
 """
 import time
 
+import numpy as np
+
+from lib.numb import digit_power_sums
+
 start_time = time.time()
 
 power = 5
@@ -30,23 +34,11 @@ upper_bound = 1000000
 # 9 digits:  999999999 >  531441 = 9 * 59049  <  111111111
 
 
-def raise_digits(n, p):
-    assert isinstance(n, int) and isinstance(p, int) and n >= 0 and p > 0, "Inputs must be positive integers"
-
-    n_digits_raised_to_p = [int(d)**p for d in list(str(n))]
-    return n_digits_raised_to_p
-
-
-total = 0
-for n in range(lower_bound, upper_bound):
-    sequence = raise_digits(n, power)
-
-    d_sum_terms_str = ' + '.join([str(k) for k in sequence])
-    d_sum = sum(sequence)
-
-    if n == d_sum:
-        print("Found match: {} = {}".format(n, d_sum_terms_str))
-        total += n
+values = np.arange(lower_bound, upper_bound)
+matches = values[digit_power_sums(values, power) == values]
+for n in matches.tolist():
+    print("Found match: {} = {}".format(n, ' + '.join(str(int(d)**power) for d in str(n))))
 
+total = int(matches.sum())
 print("Sum of matches: {}".format(total))
 print("Execution time: {}".format(time.time() - start_time))
@@ -9,6 +9,12 @@ from itertools import count
 from math import factorial
 import time
 
+import numpy as np
+
+from lib.numb import digit_sums
+
+digit_factorials = [factorial(d) for d in range(10)]
+
 
 def digital_factorials(n):
     return [factorial(int(d)) for d in str(n)]
@@ -26,13 +32,12 @@ upper_bound = factorial(9) * upper_bound_order
 # NOTE: A somewhat tighter bound can be achieved here. 7 * 9! = 2540160, which means the most signicant digit can be at most 2. This limits the bound to 2! + 6 * 9! = 2177282
 print("Upper bound: {}".format(upper_bound))
 
-total = 0
-for n in range(lower_bound, upper_bound):
-    sequence = digital_factorials(n)
+values = np.arange(lower_bound, upper_bound)
+matches = values[digit_sums(values, weights=digit_factorials) == values]
+for n in matches.tolist():
+    print("Found match: {} = {}".format(n, ' + '.join(str(d) for d in digital_factorials(n))))
 
-    if n == sum(sequence):
-        print("Found match: {} = {}".format(n, ' + '.join(str(d) for d in sequence)))
-        total += n
+total = int(matches.sum())
 
 print("Sum of matches: {}".format(total))
 print("Execution time: {}".format(time.time() - start_time))
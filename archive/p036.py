@@ -5,22 +5,23 @@ Find the sum of all numbers, less than one million, which are palindromic in bas
 
 (Please note that the palindromic number, in either base, may not include leading zeros.)
 """
-from lib.numb import is_palindrome
-from lib.seq import palindromes
 import time
 
+import numpy as np
+
+from lib.numb import palindrome_mask
+from lib.seq import palindromes
+
 start_time = time.time()
 
 limit = 1000000
 
-sum_shared = 0
-count_shared = 0
-total_count = 0
-for p in palindromes(upper=limit, base=10):
-    total_count += 1
-    if is_palindrome(bin(int(p))[2:]):
-        sum_shared += int(p)
-        count_shared += 1
+decimal_palindromes = np.array([int(p) for p in palindromes(upper=limit, base=10)])
+shared = decimal_palindromes[palindrome_mask(decimal_palindromes, base=2)]
+
+sum_shared = int(shared.sum())
+count_shared = len(shared)
+total_count = len(decimal_palindromes)
 
 print("{} shared palindromes (from {} decimal palindromes), with sum {}".format(count_shared, total_count, sum_shared))
 print("Execution time: {}".format(time.time() - start_time))
@@ -0,0 +1,122 @@
+"""
+Bounded, instrumented memoization, for use in place of `functools.lru_cache(maxsize=None)`.
+
+Each cache holds at most :param maxsize: entries and, optionally, an approximate :param maxbytes: of keys and
+values (shallow sizes, by `sys.getsizeof`). Least recently used entries are evicted first.
+
+Caches with only an entry budget are plain `functools.lru_cache` wrappers (implemented in C, so a hit costs a
+fraction of a pure Python lookup), with `cache_info` extended to report evictions. Only caches with a byte budget
+use :class BoundedCache:, which tracks sizes but costs more per call.
+"""
+from collections import namedtuple, OrderedDict
+from functools import lru_cache, update_wrapper
+from sys import getsizeof
+
+# Default entry budget for each cache
+DEFAULT_MAXSIZE = 1 << 16
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'evictions', 'size', 'maxsize', 'nbytes', 'maxbytes'])
+
+# All functions wrapped by :func bounded_cache:, by qualified name
+_registry = {}
+
+
+class BoundedCache:
+    """Wrapper for memoizing calls to :param func: in an LRU cache with bounded entry count and memory."""
+
+    def __init__(self, func, maxsize=DEFAULT_MAXSIZE, maxbytes=None):
+        update_wrapper(self, func)
+        self._func = func
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.cache_clear()
+
+    def __call__(self, *args, **kwargs):
+        key = args + tuple(sorted(kwargs.items())) if kwargs else args
+        try:
+            result = self._cache[key]
+        except KeyError:
+            pass
+        else:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return result
+
+        self.misses += 1
+        result = self._func(*args, **kwargs)
+        self._cache[key] = result
+        if self.maxbytes is not None:
+            self.nbytes += getsizeof(key) + getsizeof(result)
+        self._evict()
+        return result
+
+    def _evict(self):
+        """Evict least recently used entries until the cache is within its budgets."""
+        while self._cache and (
+            (self.maxsize is not None and len(self._cache) > self.maxsize)
+            or (self.maxbytes is not None and self.nbytes > self.maxbytes)
+        ):
+            key, result = self._cache.popitem(last=False)
+            if self.maxbytes is not None:
+                self.nbytes -= getsizeof(key) + getsizeof(result)
+            self.evictions += 1
+
+    def cache_info(self):
+        """Return hit, miss and eviction counts, along with the current size and budgets of the cache."""
+        return CacheInfo(self.hits, self.misses, self.evictions, len(self._cache), self.maxsize, self.nbytes,
+                         self.maxbytes)
+
+    def cache_clear(self):
+        """Empty the cache and reset its statistics."""
+        self._cache = OrderedDict()
+        self.hits = self.misses = self.evictions = self.nbytes = 0
+
+    def cache_resize(self, maxsize=DEFAULT_MAXSIZE, maxbytes=None):
+        """Set new budgets for the cache (None for unbounded), evicting entries as necessary."""
+        self.maxsize = maxsize
+        if maxbytes is not None and self.maxbytes is None:
+            # Byte counts are not tracked without a byte budget, so take stock of the existing entries
+            self.nbytes = sum(getsizeof(key) + getsizeof(result) for key, result in self._cache.items())
+        self.maxbytes = maxbytes
+        self._evict()
+
+
+def _entry_cache(func, maxsize):
+    """Return `functools.lru_cache` wrapper for memoizing func, with `cache_info` returning :class CacheInfo:."""
+    wrapper = lru_cache(maxsize=maxsize)(func)
+    lru_cache_info = wrapper.cache_info
+
+    def cache_info():
+        hits, misses, maxsize, size = lru_cache_info()
+        # Every miss stores an entry (unless the call raised), so any entry no longer cached was evicted
+        return CacheInfo(hits, misses, misses - size, size, maxsize, 0, None)
+
+    wrapper.cache_info = cache_info
+    return wrapper
+
+
+def bounded_cache(maxsize=DEFAULT_MAXSIZE, maxbytes=None):
+    """
+    Return decorator for memoizing a function, registered for :func cache_stats:.
+
+    Only caches with :param maxbytes: set are :class BoundedCache: wrappers (and so can be resized in place).
+    """
+    def decorator(func):
+        if maxbytes is None:
+            wrapper = _entry_cache(func, maxsize)
+        else:
+            wrapper = BoundedCache(func, maxsize=maxsize, maxbytes=maxbytes)
+        _registry[f"{func.__module__}.{func.__qualname__}"] = wrapper
+        return wrapper
+    return decorator
+
+
+def cache_stats():
+    """Return dict of :class CacheInfo: for every function wrapped by :func bounded_cache:, by qualified name."""
+    return {name: wrapper.cache_info() for name, wrapper in _registry.items()}
+
+
+def clear_all_caches():
+    """Empty every cache created by :func bounded_cache:."""
+    for wrapper in _registry.values():
+        wrapper.cache_clear()
@@ -0,0 +1,96 @@
+"""
+Clique search on graphs given as adjacency bitsets.
+
+Vertices are numbered 0, 1, ..., n - 1, and bit j of adjacency[i] is set if vertices i and j are adjacent. Python
+ints serve as bitsets of any size, so sets of candidate vertices are intersected with `&` and counted with
+`int.bit_count`.
+"""
+from functools import reduce
+from math import inf
+from operator import or_
+
+
+def to_bitset(vertices):
+    """Return bitset with the bit of each of :param vertices: set."""
+    return reduce(or_, (1 << v for v in vertices), 0)
+
+
+def iter_bits(bitset):
+    """Return generator for the vertices in bitset, in ascending order."""
+    while bitset:
+        low = bitset & -bitset
+        yield low.bit_length() - 1
+        bitset ^= low
+
+
+def maximal_cliques(adjacency):
+    """
+    Return generator for the maximal cliques of the graph, as lists of vertices.
+
+    Uses the Bron-Kerbosch algorithm with pivoting: branching only on candidates outside the neighbourhood of a
+    pivot vertex (the one with the most candidate neighbours) skips branches that can only find non-maximal cliques.
+    """
+    def expand(clique, candidates, excluded):
+        if not candidates:
+            if not excluded:
+                yield clique
+            return
+
+        pivot = max(iter_bits(candidates | excluded), key=lambda u: (candidates & adjacency[u]).bit_count())
+        for v in iter_bits(candidates & ~adjacency[pivot]):
+            yield from expand(clique + [v], candidates & adjacency[v], excluded & adjacency[v])
+            candidates ^= 1 << v
+            excluded |= 1 << v
+
+    yield from expand([], (1 << len(adjacency)) - 1, 0)
+
+
+def iter_cliques(adjacency, k, candidates=None):
+    """
+    Return generator for the cliques of k vertices (from :param candidates:, default all) in lexicographic order,
+    as ascending tuples.
+
+    Each clique is extended only by vertices above its largest, and only while enough common neighbours remain.
+    """
+    def expand(clique, candidates, k):
+        if k == 0:
+            yield tuple(clique)
+            return
+
+        for v in iter_bits(candidates):
+            candidates ^= 1 << v
+            if candidates.bit_count() < k - 1:
+                return
+            neighbours = candidates & adjacency[v]
+            if neighbours.bit_count() >= k - 1:
+                yield from expand(clique + [v], neighbours, k - 1)
+
+    yield from expand([], (1 << len(adjacency)) - 1 if candidates is None else candidates, k)
+
+
+def min_weight_clique(adjacency, k, weights):
+    """
+    Return the clique of k vertices with the least total weight, as an ascending tuple, if there is one.
+
+    NOTE: Weights must be non-decreasing in vertex order (e.g., number the vertices in ascending order of weight).
+    Then any clique extending a partial clique by vertex v weighs at least k * weights[v] more, and the search is
+    cut off as soon as that reaches the best weight found so far.
+    """
+    best, best_weight = None, inf
+
+    def expand(clique, weight, candidates, k):
+        nonlocal best, best_weight
+        if k == 0:
+            best, best_weight = tuple(clique), weight
+            return
+
+        for v in iter_bits(candidates):
+            if weight + k * weights[v] >= best_weight:
+                return
+            candidates ^= 1 << v
+            neighbours = candidates & adjacency[v]
+            if neighbours.bit_count() >= k - 1:
+                expand(clique + [v], weight + weights[v], neighbours, k - 1)
+
+    expand([], 0, (1 << len(adjacency)) - 1, k)
+    return best
@@ -0,0 +1,136 @@
+from math import gcd, isqrt
+
+from .prime import prime_factors, totient
+
+
+def modinv(a, m):
+    """Return the inverse of a modulo m, or raise ValueError if a and m are not coprime."""
+    return pow(a, -1, m)
+
+
+def crt(residues, moduli):
+    """
+    Return the unique x modulo prod(moduli) with x = r_i (mod m_i) for each residue r_i and modulus m_i.
+
+    Uses Garner's algorithm, which builds x in mixed radix form: x = v_0 + v_1*m_0 + v_2*m_0*m_1 + ...
+    NOTE: Moduli must be pairwise coprime.
+    """
+    x = 0
+    radix = 1
+    for r, m in zip(residues, moduli):
+        if gcd(radix, m) != 1:
+            raise ValueError("Moduli must be pairwise coprime")
+        # Choose the next mixed radix digit so that x + digit * radix = r (mod m)
+        digit = (r - x) * pow(radix, -1, m) % m
+        x += digit * radix
+        radix *= m
+
+    return x
+
+
+def multiplicative_order(a, n):
+    """
+    Return the smallest positive k such that a**k = 1 (mod n), for a coprime to n.
+
+    The order divides phi(n), so it is found by dividing out prime factors of phi(n) while a**(phi(n) / p) = 1.
+    Factoring phi(n) is fast for any n covered by a smallest prime factor table (see :func sieve_smallest_factors:).
+    E.g., the length of the recurring cycle of 1/d in base 10 is multiplicative_order(10, d), for d coprime to 10.
+    """
+    if gcd(a, n) != 1:
+        raise ValueError("Must provide a coprime to n")
+    elif n == 1:
+        return 1
+
+    order = totient(n)
+    for p, k in prime_factors(order).items():
+        for _ in range(k):
+            if pow(a, order // p, n) != 1:
+                break
+            order //= p
+
+    return order
+
+
+def primitive_root(n):
+    """Return the smallest primitive root modulo n, if one exists (i.e., if n is 1, 2, 4, p**k or 2*p**k for odd prime p)."""
+    if n <= 4:
+        return n - 1 if n > 1 else 0
+
+    # By the primitive root theorem, n must otherwise be an odd prime power, or twice one
+    odd_part = n // 2 if n % 4 == 2 else n
+    if odd_part % 2 == 0 or len(prime_factors(odd_part)) > 1:
+        return
+
+    phi = totient(n)
+    phi_factors = list(prime_factors(phi))
+    for g in range(2, n):
+        if gcd(g, n) == 1 and all(pow(g, phi // p, n) != 1 for p in phi_factors):
+            return g
+
+
+def sqrt_mod(a, p):
+    """
+    Return a square root of a modulo the odd prime p (the other root is p - r), if a is a quadratic residue.
+
+    Uses the Tonelli-Shanks algorithm.
+    """
+    a %= p
+    if a == 0:
+        return 0
+    elif pow(a, (p - 1) // 2, p) != 1:
+        # Not a quadratic residue, by Euler's criterion
+        return
+    elif p % 4 == 3:
+        return pow(a, (p + 1) // 4, p)
+
+    # Express p - 1 as 2**s * q, with q odd
+    q, s = p - 1, 0
+    while not q & 1:
+        q >>= 1
+        s += 1
+
+    # Find a quadratic non-residue z
+    z = 2
+    while pow(z, (p - 1) // 2, p) != p - 1:
+        z += 1
+
+    m, c, t, r = s, pow(z, q, p), pow(a, q, p), pow(a, (q + 1) // 2, p)
+    while t != 1:
+        # Find the least i with t**(2**i) = 1, then update so that t has smaller order
+        i, t_squared = 0, t
+        while t_squared != 1:
+            t_squared = t_squared * t_squared % p
+            i += 1
+        b = pow(c, 1 << (m - i - 1), p)
+        m, c, t, r = i, b * b % p, t * b * b % p, r * b % p
+
+    return r
+
+
+def discrete_log(a, b, n):
+    """
+    Return the smallest k >= 0 such that a**k = b (mod n), if one exists, for a coprime to n.
+
+    Uses the baby-step giant-step algorithm, in O(sqrt(n)) time and memory.
+    """
+    if gcd(a, n) != 1:
+        raise ValueError("Must provide a coprime to n")
+
+    a %= n
+    b %= n
+    step = isqrt(n - 1) + 1
+
+    # Baby steps: a**j for 0 <= j < step (keeping the smallest j for each value)
+    baby_steps = {}
+    a_j = 1 % n
+    for j in range(step):
+        baby_steps.setdefault(a_j, j)
+        a_j = a_j * a % n
+
+    # Giant steps: b * a**(-i*step) for 0 <= i < step
+    giant_step = pow(a, -step, n)
+    gamma = b
+    for i in range(step):
+        if gamma in baby_steps:
+            return i * step + baby_steps[gamma]
+        gamma = gamma * giant_step % n
@@ -1,32 +1,83 @@
-from collections import Counter
-from functools import lru_cache, reduce
-from itertools import permutations
+import decimal
+from functools import reduce
 import math
 from operator import mul
-from string import digits
+from string import ascii_lowercase, digits
+
+import numpy as np
+
+from .cache import bounded_cache
 
 POSITIVE_DIGITS = digits[1:]
 
+# Digits of bases up to 36, and their values
+BASE_DIGITS = digits + ascii_lowercase
+DIGIT_VALUES = {c: d for d, c in enumerate(BASE_DIGITS)}
+
+# Bit length beyond which :func to_base: converts to decimal by divide and conquer, rather than with str()
+DECIMAL_SPLIT_BITS = 1 << 12
+
+# Bit length of the pieces of an integer converted directly to decimal, during divide and conquer
+DECIMAL_LEAF_BITS = 1 << 7
+
+# Context for exact arithmetic on integers of any size with `decimal`, which traps any result that would be rounded
+EXACT_CONTEXT = decimal.Context(
+    prec=decimal.MAX_PREC, Emax=decimal.MAX_EMAX, Emin=decimal.MIN_EMIN,
+    traps=[decimal.Inexact, decimal.InvalidOperation, decimal.DivisionByZero, decimal.Overflow]
+)
+
+# Number of digits up to which :func _base_chunks: converts a chunk in one batch, with NumPy
+BASE_CHUNK_DIGITS = 1 << 16
+
+# Character codes of :data BASE_DIGITS:, indexed by digit value
+DIGIT_CODES = np.frombuffer(BASE_DIGITS.encode(), dtype=np.uint8)
+
+
+# Bit length of the largest integers whose digits :func num_digits: counts by lookup in a table of powers
+DIGIT_TABLE_BITS = 1 << 10
+
+
+@bounded_cache(maxsize=64)
+def _digit_table(base):
+    """Return log_base(2), and list of the powers of base up to the first with more than DIGIT_TABLE_BITS bits."""
+    powers = [1]
+    while powers[-1].bit_length() <= DIGIT_TABLE_BITS:
+        powers.append(powers[-1] * base)
+    return math.log(2, base), powers
+
 
-@lru_cache(maxsize=None)
 def num_digits(n, base=10):
-    """Return number of digits in n."""
+    """
+    Return number of digits in n.
+
+    For n of up to :data DIGIT_TABLE_BITS: bits, the count is estimated from n.bit_length(), which gives either the
+    exact count or one less, and then settled by a single comparison against a table of powers of the base.
+    Larger n are counted from a floating point logarithm, unless that lies too close to an integer to be trusted,
+    in which case n is compared against the nearest power of the base.
+    NumPy integers and floats are counted as the int of their integer part.
+    """
     assert n >= 0, "Must provide a non-negative integer"
+    if not isinstance(n, int):
+        n = int(n)
     if n == 0:
         return 1
-    else:
-        if base == 10:
-            this_log = math.log10
-        elif base == 2:
-            this_log = math.log2
-        else:
-            return math.floor(math.log(n, base)) + 1
-        return math.floor(this_log(n)) + 1
+
+    log_2, powers = _digit_table(base)
+    bits = n.bit_length()
+    if bits <= DIGIT_TABLE_BITS:
+        estimate = int(bits * log_2)
+        return estimate + 1 if n >= powers[estimate] else estimate
+
+    log = math.log(n, base)
+    nearest = round(log)
+    if abs(log - nearest) > 1e-12 * log:
+        return math.floor(log) + 1
+    return nearest + 1 if n >= base**nearest else nearest
 
 
 def same_digits(n, digits):
-    """Return True if n has exactly the digits in :param digits: (any iterable of digits)."""
-    return sorted(str(n)) == sorted(digits)
+    """Return True if n has exactly the digits in :param digits: (any iterable of decimal digits, as str or int)."""
+    return digit_signature(n) == _pack_digit_counts(list(map(int, digits)), 10)
 
 
 def comb(n, k):
@@ -44,13 +95,112 @@ def comb(n, k):
     return p // q
 
 
+def count_permutations(items):
+    """Return the number of distinct orderings of :param items: (i.e., permutations of a multiset)."""
+    items = list(items)
+    count = math.factorial(len(items))
+    for item in set(items):
+        count //= math.factorial(items.count(item))
+    return count
+
+
+def next_permutation(seq):
+    """
+    Return tuple of the permutation of :param seq: that follows it in lexicographic order, or None if it is the last.
+
+    Equal items are never swapped with each other, so each distinct ordering of a multiset has exactly one successor.
+    """
+    seq = list(seq)
+    # Find the rightmost ascent, then swap in the next larger item from the right and reverse the tail
+    i = len(seq) - 2
+    while i >= 0 and seq[i] >= seq[i + 1]:
+        i -= 1
+    if i < 0:
+        return
+    j = len(seq) - 1
+    while seq[j] <= seq[i]:
+        j -= 1
+    seq[i], seq[j] = seq[j], seq[i]
+    seq[i + 1:] = reversed(seq[i + 1:])
+    return tuple(seq)
+
+
+def multiset_permutations(items, start=None):
+    """
+    Return generator of the distinct orderings of :param items:, as tuples in lexicographic order, from :param start:
+    (an ordering of the items, default the first one).
+
+    Each distinct ordering is generated exactly once, in constant memory, whereas `itertools.permutations` generates
+    every ordering of repeated items (e.g., 10! for 10 digits, even if they are all the same).
+    """
+    seq = tuple(sorted(items)) if start is None else tuple(start)
+    while seq is not None:
+        yield seq
+        seq = next_permutation(seq)
+
+
+def rank_permutation(seq):
+    """
+    Return the index of :param seq: among the distinct orderings of its items, in lexicographic order (from 0).
+
+    For distinct items, each item contributes the number of smaller items after it, times the factorial of the
+    number of items after it (i.e., its digit in the factorial number system). Repeated items generalize this to
+    the number of distinct orderings that begin with each smaller item.
+    """
+    seq = list(seq)
+    counts = {item: seq.count(item) for item in set(seq)}
+    total = count_permutations(seq)
+    rank = 0
+    for m, item in zip(range(len(seq), 0, -1), seq):
+        # Orderings of the m remaining items beginning with x number total * counts[x] / m
+        rank += sum(total * counts[x] // m for x in counts if x < item)
+        total = total * counts[item] // m
+        counts[item] -= 1
+        if not counts[item]:
+            del counts[item]
+
+    return rank
+
+
+def unrank_permutation(items, index):
+    """
+    Return tuple of the distinct ordering of :param items: with the given index in lexicographic order (from 0), as
+    inverted by :func rank_permutation:.
+    """
+    items = sorted(items)
+    total = count_permutations(items)
+    if not 0 <= index < total:
+        raise ValueError(f"Index must be in the range [0, {total})")
+
+    counts = {item: items.count(item) for item in items}
+    seq = []
+    for m in range(len(items), 0, -1):
+        for item in counts:
+            block = total * counts[item] // m
+            if index < block:
+                break
+            index -= block
+        seq.append(item)
+        total = block
+        counts[item] -= 1
+        if not counts[item]:
+            del counts[item]
+
+    return tuple(seq)
+
+
 def perm(n, preserve_length=True):
-    """Return set of numbers that are permutations of the digits of n."""
-    if preserve_length:
-        # Throw away any permutations that begin with a zero
-        return set(map(lambda x: int(''.join(x)), filter(lambda x: x[0] != '0', permutations(str(n)))))
-    else:
-        return set(map(lambda x: int(''.join(x)), permutations(str(n))))
+    """
+    Return generator of the distinct numbers whose digits are permutations of the digits of n, in ascending order.
+
+    If :param preserve_length:=True, permutations beginning with a zero are skipped, by starting from the least
+    permutation with a nonzero leading digit.
+    """
+    n_digits = sorted(str(n))
+    if preserve_length and n_digits[-1] != '0':
+        n_digits.insert(0, n_digits.pop(n_digits.count('0')))
+
+    return (int(''.join(p)) for p in multiset_permutations(n_digits, start=n_digits))
 
 
 def incr(n, base=10, incr=1):
@@ -81,35 +231,340 @@ def is_pandigital(n, pandigits):
 
 def is_permutation(m, n, base=10):
     "Return True if the digits of m and n are a permutation of each other."
-    return Counter(to_str(m, base=base)) == Counter(to_str(n, base=base))
+    return digit_signature(m, base) == digit_signature(n, base)
+
+
+@bounded_cache(maxsize=64)
+def _signature_layout(base):
+    """
+    Return the number of bits for each digit count in a :func digit_signature:, and the bound below which integers
+    have few enough digits for every count to fit.
+
+    Counts are given enough bits to count the digits of any 64-bit integer, so that the signatures of unsigned
+    64-bit arrays (see :func digit_signatures:) are exact.
+    """
+    max_digits = 0
+    n = 2**64 - 1
+    while n:
+        n //= base
+        max_digits += 1
+    width = max_digits.bit_length()
+    return width, base ** ((1 << width) - 1)
+
+
+def _pack_digit_counts(digits, base):
+    """Return :func digit_signature: of the integer with the given sequence of digits."""
+    width, _ = _signature_layout(base)
+    if len(digits) >= 1 << width:
+        counts = [0] * base
+        for d in digits:
+            counts[d] += 1
+        return tuple(counts)
+    return sum(1 << (d * width) for d in digits)
+
+
+def digit_signature(n, base=10):
+    """
+    Return a key for the multiset of digits of n in the given base, which is equal for two integers exactly when
+    their digits are permutations of each other.
+
+    The key is an int packing the count of each digit d into the bits from d * width, where the width (5 bits in
+    base 10) is enough for integers below 2**64, or any integer with fewer than 2**width digits. For any larger
+    integers, the key is a tuple of digit counts instead.
+    """
+    assert n >= 0, "Must provide a non-negative integer"
+    width, limit = _signature_layout(base)
+    if n >= limit:
+        n_digits = []
+        while n:
+            n, d = divmod(n, base)
+            n_digits.append(d)
+        return _pack_digit_counts(n_digits, base)
+
+    signature = 0
+    while True:
+        n, d = divmod(n, base)
+        signature += 1 << (d * width)
+        if not n:
+            return signature
+
+
+def digit_signatures(values, base=10):
+    """
+    Return NumPy array of :func digit_signature: for each of an array of non-negative integers below 2**64.
+
+    Each signature is a 64-bit unsigned integer, so this only works for bases in which the digit counts fit (i.e.,
+    bases up to 12). Permutations can then be grouped with `np.unique`, or matched with array comparisons.
+    """
+    width, _ = _signature_layout(base)
+    if base * width > 64:
+        raise ValueError(f"Digit signatures in base {base} do not fit in 64 bits")
+    return digit_sums(values, base=base, weights=[1 << (d * width) for d in range(base)])
+
+
+# Digit kernels over arrays of non-negative integers below 2**64 (as uint64), which work a chunk of digits at a time
+@bounded_cache(maxsize=64)
+def _base_powers(base):
+    """Return NumPy array of the powers of base below 2**64."""
+    powers = [1]
+    while powers[-1] * base < 2**64:
+        powers.append(powers[-1] * base)
+    return np.array(powers, dtype=np.uint64)
+
+
+@bounded_cache(maxsize=64)
+def _chunk_digits(base):
+    """
+    Return NumPy array of the digits of every chunk, i.e. every integer below base**k (for k digits fitting in 14
+    bits, e.g. 4 decimal digits), with one row of k digits per chunk, least significant first.
+    """
+    chunk_len = max(1, int(math.log(1 << 14, base)))
+    remaining = np.arange(base ** chunk_len, dtype=np.uint64)
+    digits = np.empty((len(remaining), chunk_len), dtype=np.uint64)
+    for i in range(chunk_len):
+        remaining, digits[:, i] = np.divmod(remaining, np.uint64(base))
+    return digits
+
+
+def digit_lengths(values, base=10):
+    """Return NumPy array of the number of digits of each of an array of integers, as for :func num_digits:."""
+    values = np.asarray(values).astype(np.uint64)
+    return np.searchsorted(_base_powers(base)[1:], values, side='right') + 1
+
+
+def digit_sums(values, base=10, weights=None):
+    """
+    Return NumPy array of the sum of digits of each of an array of integers, or the sum of weights[d] over the
+    digits d, if :param weights: (a sequence of non-negative integers, one for each digit) is given.
+
+    E.g., the sum of factorials of the decimal digits of each value, for weights=[math.factorial(d) for d in
+    range(10)]. Sums are taken modulo 2**64.
+
+    Digits are summed a chunk at a time, by lookup in a table of sums for every chunk. Chunks are padded with
+    leading zeros, so the weight of any excess zeros is taken back off, using the number of digits in each value.
+    """
+    weights = np.arange(base, dtype=np.uint64) if weights is None else np.array(weights, dtype=object).astype(np.uint64)
+    chunk_digits = _chunk_digits(base)
+    chunk_sums = weights[chunk_digits].sum(axis=1, dtype=np.uint64)
+    chunk, chunk_len = chunk_digits.shape
+
+    values = np.asarray(values).astype(np.uint64)
+    sums = digit_lengths(values, base).astype(np.uint64) * weights[0]
+    while True:
+        values, chunks = np.divmod(values, np.uint64(chunk))
+        sums += chunk_sums[chunks] - np.uint64(chunk_len) * weights[0]
+        if not values.any():
+            return sums
+
+
+def digit_power_sums(values, power, base=10):
+    """Return NumPy array of the sum of the digits of each of an array of integers, each raised to :param power:."""
+    return digit_sums(values, base=base, weights=[d**power for d in range(base)])
+
+
+def reversals(values, base=10):
+    """
+    Return NumPy array of the integers given by reversing the digits of each of an array of integers (so trailing
+    zeros are dropped, as for int(reverse(n))).
+
+    NOTE: Reversals that exceed 2**64 (which can only happen for values with 20 decimal digits) wrap around.
+    """
+    chunk_digits = _chunk_digits(base)
+    chunk, chunk_len = chunk_digits.shape
+    powers = _base_powers(base)
+    # Reversals of whole chunks (keeping any zeros that the chunk is padded with), and of the leading chunk
+    chunk_reversals = chunk_digits @ powers[chunk_len - 1::-1]
+    chunk_lengths = digit_lengths(np.arange(chunk), base)
+    leading_reversals = chunk_reversals // powers[chunk_len - chunk_lengths]
+
+    values = np.asarray(values).astype(np.uint64)
+    reversed_values = np.zeros_like(values)
+    while (remaining := values > 0).any():
+        values, chunks = np.divmod(values, np.uint64(chunk))
+        leading = values == 0
+        shifted = reversed_values * np.where(leading, powers[chunk_lengths[chunks]], np.uint64(chunk))
+        reversed_values = np.where(
+            remaining, shifted + np.where(leading, leading_reversals[chunks], chunk_reversals[chunks]), reversed_values
+        )
+
+    return reversed_values
+
+
+def palindrome_mask(values, base=10):
+    """Return NumPy boolean array marking the palindromes (in the given base) among an array of integers."""
+    values = np.asarray(values).astype(np.uint64)
+    return reversals(values, base) == values
+
+
+def digit_arrays(values, base=10, length=None):
+    """
+    Return NumPy array of the digits of each of an array of integers, most significant first, along a new last
+    axis of :param length: digits (default, enough for the largest value), padded with leading zeros.
+    """
+    values = np.asarray(values).astype(np.uint64)
+    if length is None:
+        length = int(digit_lengths(values, base).max(initial=1))
+
+    digits = np.empty(values.shape + (length,), dtype=np.uint8 if base <= 256 else np.uint64)
+    for i in range(length - 1, -1, -1):
+        values, digits[..., i] = np.divmod(values, np.uint64(base))
+    return digits
+
+
+def _leaf_digits(n, base):
+    """Return str of the digits of small n in the given base."""
+    chars = []
+    while n:
+        n, d = divmod(n, base)
+        chars.append(BASE_DIGITS[d])
+    return ''.join(reversed(chars)) or '0'
+
+
+def _split_powers(n, base):
+    """
+    Return list of (base**width, width) as `Decimal` powers, with width doubling from a leaf width (digits of base
+    in 64 bits), up to the first power whose square exceeds the `Decimal` n.
+    """
+    width = max(1, int(64 / math.log2(base)))
+    powers = [(decimal.Decimal(base**width), width)]
+    square = EXACT_CONTEXT.multiply(powers[0][0], powers[0][0])
+    while square <= n:
+        width *= 2
+        powers.append((square, width))
+        square = EXACT_CONTEXT.multiply(square, square)
+    return powers
+
+
+def _leaf_values(n, powers, level, pad, values):
+    """Append the values of the leaves of the `Decimal` n (as split by :func _base_chunks:) to :param values:."""
+    if level < 0:
+        values.append(int(n))
+        return
+
+    high, low = EXACT_CONTEXT.divmod(n, powers[level][0])
+    if high or pad:
+        _leaf_values(high, powers, level - 1, pad, values)
+    _leaf_values(low, powers, level - 1, pad or bool(high), values)
+
+
+def _base_chunks(n, base, powers, level, pad=False):
+    """
+    Return generator of str chunks of the digits of the `Decimal` n < powers[level][0]**2 in the given base, most
+    significant first, padded with leading zeros to 2 * powers[level][1] digits if :param pad:=True.
+
+    Divide and conquer: n splits into a high and low half of the digits by division by powers[level][0], and each
+    half is split at the next lower level, down to leaves that fit in 64 bits. Division is done with `decimal`,
+    which divides large numbers by Newton's method in subquadratic time (unlike int division in many versions of
+    Python). Chunks of up to :data BASE_CHUNK_DIGITS: digits are split all the way down at once, and the digits of
+    their leaves are extracted together (see :func digit_arrays:).
+    """
+    if level < 0 or 2 * powers[level][1] <= BASE_CHUNK_DIGITS:
+        values = []
+        _leaf_values(n, powers, level, pad, values)
+        digits = digit_arrays(np.array(values, dtype=np.uint64), base, powers[0][1])
+        chunk = DIGIT_CODES[digits].tobytes().decode()
+        yield chunk if pad else chunk.lstrip('0')
+        return
+
+    power, _ = powers[level]
+    high, low = EXACT_CONTEXT.divmod(n, power)
+    if high or pad:
+        yield from _base_chunks(high, base, powers, level - 1, pad)
+        yield from _base_chunks(low, base, powers, level - 1, True)
+    else:
+        yield from _base_chunks(low, base, powers, level - 1, False)
+
+
+def _decimal_from_int(n):
+    """
+    Return `Decimal` equal to non-negative n, in subquadratic time.
+
+    Divide and conquer on the binary digits of n: n = high * 2**k + low is rebuilt from its halves as a `Decimal`,
+    with precomputed powers of 2, since `decimal` multiplies large numbers in subquadratic time (unlike int
+    division in many versions of Python, which would make converting by division by powers of 10 quadratic).
+    """
+    powers_of_2 = {}
+
+    def power_of_2(k):
+        if k not in powers_of_2:
+            if k <= DECIMAL_LEAF_BITS:
+                powers_of_2[k] = decimal.Decimal(1 << k)
+            else:
+                powers_of_2[k] = EXACT_CONTEXT.multiply(power_of_2(k >> 1), power_of_2(k - (k >> 1)))
+        return powers_of_2[k]
+
+    def convert(n, bits):
+        if bits <= DECIMAL_LEAF_BITS:
+            return decimal.Decimal(n)
+        half = bits >> 1
+        high = n >> half
+        return EXACT_CONTEXT.add(
+            EXACT_CONTEXT.multiply(convert(high, bits - half), power_of_2(half)), convert(n - (high << half), half)
+        )
+
+    return convert(n, n.bit_length())
+
+
+def _to_decimal(n):
+    """Return str of the decimal digits of non-negative n, in subquadratic time (see :func _decimal_from_int:)."""
+    return str(_decimal_from_int(n))
 
 
 def to_base(n, base=10):
     """
-    Return a str representation of the decimal number n in the given base.
+    Return a str representation of the integer n in the given base (2 to 36, with digits 0-9 then a-z).
 
-    NOTE: Only works for :base: <= 10.
+    Conversion is linear in the number of digits for bases that are powers of 2 (by `format`, regrouping binary
+    digits for bases 4 and 32), and subquadratic otherwise: n is converted to `Decimal` by divide and conquer (see
+    :func _decimal_from_int:), which gives base 10 directly, and other bases are then split off by division by
+    repeatedly squared powers of the base (see :func _base_chunks:).
+    NOTE: Division costs several times as much as the multiplication that suffices for base 10, so that a million
+    digits take about 0.5 seconds in base 10 (and less in bases that are powers of 2), but 2 to 3 seconds in others.
     """
-    if n == 0:
-        return '0'
-    elif base == 2:
-        if int(n) < 0:
-            return '-' + bin(-int(n))[2:]
-        else:
-            return bin(int(n))[2:]
-    elif n < 0:
-        return -to_base(-int(n), base)
+    if not 2 <= base <= 36:
+        raise ValueError("Base must be from 2 to 36")
+    n = int(n)
+    if n < 0:
+        return '-' + to_base(-n, base)
+    elif base in (2, 8, 16):
+        return format(n, {2: 'b', 8: 'o', 16: 'x'}[base])
+    elif not base & (base - 1):
+        # Regroup the binary digits, from the least significant, into digits of base 2**bits
+        bits = base.bit_length() - 1
+        binary = format(n, 'b')
+        binary = np.frombuffer(binary.zfill(-(-len(binary) // bits) * bits).encode(), dtype=np.uint8) - ord('0')
+        values = binary.reshape(-1, bits) @ (1 << np.arange(bits - 1, -1, -1))
+        return DIGIT_CODES[values].tobytes().decode()
+    elif base == 10:
+        return str(n) if n.bit_length() <= DECIMAL_SPLIT_BITS else _to_decimal(n)
+
+    elif n.bit_length() <= 64:
+        return _leaf_digits(n, base)
+
+    n = _decimal_from_int(n)
+    powers = _split_powers(n, base)
+    return ''.join(_base_chunks(n, base, powers, len(powers) - 1))
+
+
+def digits_iter(n, base=10):
+    """
+    Return generator of the digits of non-negative n in the given base, as ints, most significant first.
+
+    Digits are produced from large chunks of the str representation given by :func to_base:, without building it
+    whole, except in base 10 and bases that are powers of 2, whose conversions are fast enough to do up front.
+    """
+    assert n >= 0, "Must provide a non-negative integer"
+    if not base & (base - 1) or base == 10 or n.bit_length() <= 64:
+        chunks = [to_base(n, base)]
     else:
-        p, r = divmod(int(n), base)
-        if p:
-            return to_base(p, base) + str(r)
-        else:
-            return str(r)
+        n = _decimal_from_int(n)
+        powers = _split_powers(n, base)
+        chunks = _base_chunks(n, base, powers, len(powers) - 1)
+
+    for chunk in chunks:
+        yield from map(DIGIT_VALUES.__getitem__, chunk)
 
 
 def to_str(n, base=10):
-    """Return decimal integer n as a str in the given base."""
-    if base == 10:
-        return str(n)
-    else:
-        return to_base(n, base=base)
+    """Return integer n as a str in the given base (see :func to_base:)."""
+    return to_base(n, base=base)
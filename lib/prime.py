@@ -1,126 +1,736 @@
-from functools import lru_cache, reduce
-from itertools import count, product, takewhile
-from math import sqrt
+from array import array
+from bisect import bisect
+from concurrent.futures import ProcessPoolExecutor
+from functools import reduce
+from heapq import heappop, heappush
+from itertools import chain, combinations_with_replacement, compress, count, cycle, islice
+from math import gcd, isqrt, log, sqrt
+from mmap import ACCESS_READ, mmap
+from multiprocessing.shared_memory import SharedMemory
 from operator import mul
-from random import sample
+import os
+from random import randrange
+from struct import Struct
+
+import numpy as np
+
+from .cache import bounded_cache
+from .common import data
+from .numb import multiset_permutations
+
+
+# Primes used for quick trial division before probabilistic primality tests
+SMALL_PRIMES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41, 43, 47)
+
+# Bound below which :func nth_prime: takes primes directly from the prime cache, rather than counting them
+NTH_PRIME_SIEVE_LIMIT = 10**5
+
+# Bound on the primes used for trial division by :func prime_factors:, before turning to Pollard's rho
+FACTOR_TRIAL_LIMIT = 1 << 12
+
+# Bound below which :func is_prime: uses trial division, rather than Miller-Rabin, for values outside the cache
+TRIAL_DIVISION_LIMIT = 1 << 15
+
+# Bound on the primes by which :func is_prime_many: trial divides values outside the cache
+BATCH_TRIAL_LIMIT = 1 << 8
+
+# Number of values below which :func is_prime_many: skips (or stops) trial division in NumPy, testing them one by one
+MIN_TRIAL_BATCH_SIZE = 1 << 6
+
+# Number of values left for Miller-Rabin from which :func is_prime_many: uses its process pool
+PARALLEL_BATCH_SIZE = 1 << 12
+
+# Bound below which :func is_prime_many: runs Miller-Rabin in NumPy (so that products of residues fit in 64 bits)
+BATCH_MILLER_RABIN_LIMIT = 1 << 32
+
+# Bound below which :func prime_pair_graph: sieves concatenations into the prime cache, rather than testing them
+PAIR_SIEVE_LIMIT = 10**8
+
+# Number of concatenations that :func prime_pair_graph: tests in each batch
+PAIR_BATCH_SIZE = 1 << 16
+
+# Bases for which the Miller-Rabin test is deterministic for all n below each bound
+# (see https://oeis.org/A014233 and https://miller-rabin.appspot.com)
+MILLER_RABIN_BASES = (
+    (1_373_653, (2, 3)),
+    (25_326_001, (2, 3, 5)),
+    (3_215_031_751, (2, 3, 5, 7)),
+    (4_759_123_141, (2, 7, 61)),
+    (2_152_302_898_747, (2, 3, 5, 7, 11)),
+    (3_474_749_660_383, (2, 3, 5, 7, 11, 13)),
+    (341_550_071_728_321, (2, 3, 5, 7, 11, 13, 17)),
+    (18_446_744_073_709_551_616, (2, 325, 9375, 28178, 450775, 9780504, 1795265022)),
+    (318_665_857_834_031_151_167_461, (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37)),
+    (3_317_044_064_679_887_385_961_981, (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)),
+)
+
+# Default file name (under the data directory) for saving the prime cache
+PRIME_CACHE_FILE = 'primes.bin'
+
+# Number of odd integers covered by each segment when extending the prime cache (sized to sit in L2 cache)
+SEGMENT_SIZE = 1 << 17
+
+
+# Sieving tools
+def _estimate_prime_limit(num_primes):
+    """Return an integer above the nth prime, for n = :param num_primes:, via bounds on the prime-counting function."""
+    if num_primes < 6:
+        return 14
+    # Rosser's theorem gives p_n < n * (ln(n) + ln(ln(n))) for n >= 6
+    return int(num_primes * (log(num_primes) + log(log(num_primes)))) + 1
+
+
+def _sieve_odd(limit):
+    """
+    Return a bytearray flagging primality of odd numbers below :param limit: by the Sieve of Eratosthenes.
+
+    Index i of the result represents the odd number 2*i + 1.
+    """
+    size = limit // 2
+    sieve = bytearray([1]) * size
+    if size:
+        sieve[0] = 0  # 1 is not prime
+
+    for i in range(1, (isqrt(max(limit - 1, 0)) - 1) // 2 + 1):
+        if sieve[i]:
+            # Cross off odd multiples of p = 2*i + 1, starting from p**2 (with index 2*i*(i + 1))
+            start = 2 * i * (i + 1)
+            sieve[start::2 * i + 1] = bytes(len(range(start, size, 2 * i + 1)))
+
+    return sieve
+
+
+def _sieve_segment(lo, hi, base_primes):
+    """
+    Return a bytearray flagging primality of odd numbers in the range [lo, hi), for odd lo.
+
+    Index i of the result represents the odd number lo + 2*i.
+    :param base_primes: must include every odd prime up to sqrt(hi), in ascending order.
+    """
+    size = (hi - lo + 1) // 2
+    segment = bytearray([1]) * size
+    if lo == 1:
+        segment[0] = 0  # 1 is not prime
+
+    for p in base_primes:
+        multiple = p * p
+        if multiple >= hi:
+            break
+        elif multiple < lo:
+            # Start from the first odd multiple of p in the segment
+            multiple = lo + (-lo) % p
+            if not multiple & 1:
+                multiple += p
+        start = (multiple - lo) // 2
+        segment[start::p] = bytes(len(range(start, size, p)))
+
+    return segment
+
+
+def _sieve_shared_segments(shm_name, lo, hi, offset, base_primes):
+    """
+    Sieve odd numbers in the range [lo, hi) into a bit-vector held in the shared memory block named :param shm_name:.
+
+    Each segment is packed (as in :class PrimeCache:) and written to the block starting from byte :param offset:.
+    """
+    shm = SharedMemory(name=shm_name)
+    try:
+        for segment_lo in range(lo, hi, 2 * SEGMENT_SIZE):
+            segment = _sieve_segment(segment_lo, min(segment_lo + 2 * SEGMENT_SIZE, hi), base_primes)
+            packed = np.packbits(np.frombuffer(segment, dtype=np.uint8), bitorder='little')
+            start = offset + (segment_lo - lo) // 16
+            shm.buf[start:start + len(packed)] = packed.tobytes()
+    finally:
+        shm.close()
+
+
+def _sieve_parallel(lo, hi, base_primes, workers):
+    """
+    Return the packed bit-vector of odd numbers in the range [lo, hi), sieved by a pool of :param workers: processes.
+
+    The range is split into chunks of whole segments, several per worker to balance the load. Workers write their
+    results directly into a shared memory block, so that nothing has to be pickled back.
+    """
+    chunk_span = 2 * SEGMENT_SIZE * max(1, -(-(hi - lo) // (2 * SEGMENT_SIZE * 4 * workers)))
+    size = (hi - lo) // 16
+    shm = SharedMemory(create=True, size=size)
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(
+                    _sieve_shared_segments, shm.name, chunk_lo, min(chunk_lo + chunk_span, hi), (chunk_lo - lo) // 16,
+                    base_primes
+                )
+                for chunk_lo in range(lo, hi, chunk_span)
+            ]
+            for future in futures:
+                future.result()
+        return bytes(shm.buf[:size])
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+class PrimeCache:
+    """
+    Compact cache of sequential primes, for avoiding multiple runs of :func sieve_primes:.
+
+    Primes are stored in an array of machine integers (4 bytes each below 2**32, otherwise 8 bytes) for list-like
+    access by index or slice, alongside an odd-only bit-vector (one bit per odd integer) for constant time
+    membership tests with `in`.
+
+    The bit-vector can be saved to a file and memory-mapped back in, in which case the array is unpacked from it
+    lazily, only as far as indexing requires.
+
+    Slices are returned as new lists of Python ints. Callers that only iterate or index should take a :meth view:
+    of the array instead, which does not convert the primes.
+    """
+
+    # File header: magic bytes (including format version), followed by the sieve limit
+    _header = Struct('<8sQ')
+    _magic = b'EPRIME01'
+
+    # Shared memory header: magic bytes, sieve limit, number of primes and typecode of the prime array
+    _shared_header = Struct('<8sQQ8s')
+    _shared_magic = b'EPRSHM01'
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        """Reset the cache to contain only the prime 2."""
+        self.limit = 1  # Odd upper bound (exclusive) of the integers sieved into the cache
+        self._bits = bytearray()  # Bit k (little-endian within each byte) flags primality of 2*k + 1
+        self._primes = array('I', [2])
+        self._primes_limit = 1  # Upper bound of the primes unpacked from the bit-vector into the array
+        self._shm = None  # Shared memory block viewed by the cache, if any (see :meth attach:)
+
+    def __len__(self):
+        self._unpack()
+        return len(self._primes)
+
+    def __iter__(self):
+        self._unpack()
+        return iter(self._primes)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            if key.stop is not None and key.stop >= 0 and (key.start or 0) >= 0 and (key.step or 1) > 0:
+                self._unpack_count(key.stop)
+            else:
+                self._unpack()
+            return self._primes[key].tolist()
+
+        if key >= 0:
+            self._unpack_count(key + 1)
+        else:
+            self._unpack()
+        return self._primes[key]
+
+    def __contains__(self, n):
+        if not isinstance(n, int):
+            # Accept NumPy integers, and floats with integral values
+            if n != int(n):
+                return False
+            n = int(n)
+
+        if n & 1:
+            if not 1 < n < self.limit:
+                return False
+            k = n >> 1
+            return bool(self._bits[k >> 3] >> (k & 7) & 1)
+        return n == 2
+
+    def contains_many(self, values):
+        """Return NumPy boolean array marking the primes among :param values: (integers below :attr limit:)."""
+        values = np.asarray(values, dtype=np.int64)
+        # Even values are excluded by parity, but may lie just past the bit-vector
+        k = np.minimum(values, self.limit - 2) >> 1
+        bits = np.frombuffer(self._bits, dtype=np.uint8)
+        return (values & 1).astype(bool) & (bits[k >> 3] >> (k & 7) & 1).astype(bool) | (values == 2)
+
+    def view(self, stop, start=0):
+        """
+        Return the cached primes with indices start <= i < stop, as an array (or a read-only memoryview, if the
+        cache is shared), without converting them to Python ints.
+        """
+        self._unpack_count(stop)
+        return self._primes[start:stop]
+
+    def available(self, num_primes):
+        """Return the number of cached primes, or :param num_primes: if that is fewer (unpacking only as needed)."""
+        self._unpack_count(num_primes)
+        return min(len(self._primes), num_primes)
+
+    def pi(self, n):
+        """Return the number of cached primes that do not exceed n."""
+        self._unpack(int(n) + 1)
+        return bisect(self._primes, n)
+
+    def _unpack(self, limit=None):
+        """Unpack primes below :param limit: (default, all of them) from the bit-vector into the array."""
+        limit = self.limit if limit is None else min(limit, self.limit)
+        if self._primes_limit >= limit:
+            return
+
+        dtype = np.uint32 if self._primes.typecode == 'I' else np.uint64
+        while self._primes_limit < limit:
+            lo = self._primes_limit
+            hi = min(lo + 2 * SEGMENT_SIZE, self.limit)
+            flags = np.unpackbits(
+                np.frombuffer(self._bits, dtype=np.uint8, count=(hi - lo) // 16, offset=lo // 16),
+                bitorder='little'
+            )
+            self._primes.frombytes((np.flatnonzero(flags).astype(dtype) * 2 + lo).tobytes())
+            self._primes_limit = hi
+
+    def _unpack_count(self, num_primes):
+        """Unpack primes from the bit-vector until the array holds at least :param num_primes: primes (if cached)."""
+        while len(self._primes) < num_primes and self._primes_limit < self.limit:
+            self._unpack(self._primes_limit + 1)
+
+    def extend(self, limit, workers=None):
+        """
+        Extend the cache to include all primes below :param limit:, sieving one segment at a time.
+
+        With :param workers: > 1, segments of a large extension are sieved in parallel by a pool of processes (see
+        :func _sieve_parallel:), and the new primes are unpacked from the bit-vector lazily.
+        """
+        if limit <= self.limit:
+            return
+
+        # Round up so that every segment fills whole bytes of the bit-vector
+        limit += -(limit - 1) % 16
+
+        # Take writable copies of a memory-mapped or shared cache
+        if not isinstance(self._bits, bytearray):
+            self._bits = bytearray(self._bits)
+        if not isinstance(self._primes, array):
+            primes = array(self._primes.format)
+            primes.frombytes(self._primes.cast('B'))
+            self._primes = primes
+
+        # Reuse cached primes as the base for sieving segments, if there are enough of them
+        root = isqrt(limit - 1)
+        if root < self.limit:
+            base_primes = self._primes[1:self.pi(root)]
+        else:
+            base_primes = list(compress(range(1, root + 1, 2), _sieve_odd(root + 1)))
+
+        if limit > 1 << 32 and self._primes.typecode == 'I':
+            self._primes = array('Q', self._primes)
+        dtype = np.uint32 if self._primes.typecode == 'I' else np.uint64
+
+        if workers and workers > 1 and limit - self.limit > 2 * SEGMENT_SIZE * workers:
+            self._bits += _sieve_parallel(self.limit, limit, base_primes, workers)
+            self.limit = limit
+            return
+
+        self._unpack()
+        for lo in range(self.limit, limit, 2 * SEGMENT_SIZE):
+            segment = np.frombuffer(_sieve_segment(lo, min(lo + 2 * SEGMENT_SIZE, limit), base_primes), dtype=np.uint8)
+            self._bits += np.packbits(segment, bitorder='little').tobytes()
+            self._primes.frombytes((np.flatnonzero(segment).astype(dtype) * 2 + lo).tobytes())
+
+        self.limit = self._primes_limit = limit
+
+    def share(self):
+        """
+        Return a new shared memory block holding a copy of the cache, for other processes to :meth attach:.
+
+        The caller owns the block, and should close and unlink it once other processes are done with it.
+        """
+        self._unpack()
+        bits_size = len(self._bits)
+        primes_offset = self._shared_header.size + bits_size + -bits_size % 8
+        primes_size = len(self._primes) * self._primes.itemsize
+        # The primes of an attached cache are a memoryview, with a format in place of a typecode
+        typecode = getattr(self._primes, 'typecode', None) or self._primes.format
+
+        shm = SharedMemory(create=True, size=primes_offset + primes_size)
+        self._shared_header.pack_into(shm.buf, 0, self._shared_magic, self.limit, len(self._primes), typecode.encode())
+        shm.buf[self._shared_header.size:self._shared_header.size + bits_size] = self._bits
+        shm.buf[primes_offset:primes_offset + primes_size] = self._primes.tobytes()
+        return shm
+
+    def attach(self, shm):
+        """
+        Replace the cache with a read-only view of the shared memory block :param shm: (see :meth share:).
+
+        Nothing is copied unless the cache is extended, in which case the process takes its own copy first.
+        """
+        magic, limit, num_primes, typecode = self._shared_header.unpack_from(shm.buf)
+        if magic != self._shared_magic:
+            raise ValueError("Shared memory block {} does not hold a prime cache".format(shm.name))
+        typecode = typecode.rstrip(b'\0').decode()
+
+        bits_size = limit // 16
+        primes_offset = self._shared_header.size + bits_size + -bits_size % 8
+        primes_size = num_primes * array(typecode).itemsize
+
+        self.clear()
+        self._shm = shm  # Keep the block open for as long as the cache refers to it
+        self._bits = shm.buf[self._shared_header.size:self._shared_header.size + bits_size].toreadonly()
+        self._primes = shm.buf[primes_offset:primes_offset + primes_size].cast(typecode).toreadonly()
+        self.limit = self._primes_limit = limit
+
+    def _read_header(self, f):
+        """Return the sieve limit recorded in the header of an open cache file, after validating the file."""
+        header = f.read(self._header.size)
+        if len(header) < self._header.size:
+            raise ValueError("Prime cache file {} is truncated".format(f.name))
+
+        magic, limit = self._header.unpack(header)
+        if magic != self._magic:
+            raise ValueError("Prime cache file {} has an unrecognized header".format(f.name))
+        elif limit % 16 != 1 or os.fstat(f.fileno()).st_size != self._header.size + limit // 16:
+            raise ValueError("Prime cache file {} does not match its header".format(f.name))
+
+        return limit
+
+    def load(self, path):
+        """Replace the cache with one memory-mapped from the file at :param path: (see :meth save:)."""
+        with open(path, 'rb') as f:
+            limit = self._read_header(f)
+            bits = mmap(f.fileno(), 0, access=ACCESS_READ) if limit > 1 else b''
+
+        self.clear()
+        self._bits = memoryview(bits)[self._header.size:]
+        self.limit = limit
+        if limit > 1 << 32:
+            self._primes = array('Q', [2])
+
+    def save(self, path):
+        """
+        Save the bit-vector of the cache to the file at :param path:.
+
+        An existing cache file over a smaller range is extended in place, by appending to it and updating its header.
+        A file covering a larger range is left as it is.
+        """
+        try:
+            with open(path, 'r+b') as f:
+                saved_limit = self._read_header(f)
+                if saved_limit <= self.limit:
+                    f.seek(0, os.SEEK_END)
+                    f.write(self._bits[saved_limit // 16:])
+                    f.seek(0)
+                    f.write(self._header.pack(self._magic, self.limit))
+                return
+        except (FileNotFoundError, ValueError):
+            pass
+
+        with open(path, 'wb') as f:
+            f.write(self._header.pack(self._magic, self.limit))
+            f.write(self._bits)
 
 
 # A cache of sequential primes for avoiding multiple runs of :func sieve_primes:
-CACHED_PRIMES_L = [2]
-CACHED_PRIMES = set(CACHED_PRIMES_L)
+CACHED_PRIMES = PrimeCache()
 
 
 # Generation and cache tools
-def update_prime_cache(sorted_cache):
-    global CACHED_PRIMES, CACHED_PRIMES_L
-    CACHED_PRIMES_L = sorted_cache
-    CACHED_PRIMES = set(CACHED_PRIMES_L)
+def clear_prime_cache():
+    CACHED_PRIMES.clear()
 
 
-def clear_prime_cache():
-    update_prime_cache([2])
+def load_prime_cache(path=None, max_prime=None):
+    """
+    Memory-map the prime cache from a file saved by :func save_prime_cache: (default: data/primes.bin).
+
+    If :param max_prime: exceeds the range of the file (or the file does not exist yet), the cache is extended to
+    include it and the file is extended to match.
+    """
+    path = path or data(PRIME_CACHE_FILE)
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            saved_limit = CACHED_PRIMES._read_header(f)
+        if saved_limit > CACHED_PRIMES.limit:
+            CACHED_PRIMES.load(path)
+
+    if max_prime and max_prime >= CACHED_PRIMES.limit:
+        CACHED_PRIMES.extend(int(max_prime) + 1)
+        CACHED_PRIMES.save(path)
+
+
+def save_prime_cache(path=None):
+    """Save the prime cache to a file (default: data/primes.bin), for loading later by :func load_prime_cache:."""
+    CACHED_PRIMES.save(path or data(PRIME_CACHE_FILE))
+
+
+def share_prime_cache():
+    """
+    Publish the prime cache in a new shared memory block, and return the block.
+
+    Worker processes can then call :func attach_prime_cache: with the name of the block (e.g., as the initializer
+    of a process pool) to use the cache without copying it or sieving for themselves. The caller should close and
+    unlink the block once the workers are done.
+    """
+    return CACHED_PRIMES.share()
+
+
+def attach_prime_cache(name):
+    """Replace the prime cache with a read-only view of the shared memory block published by :func share_prime_cache:."""
+    CACHED_PRIMES.attach(SharedMemory(name=name))
 
 
 def get_cached_primes(as_set=False):
+    """Return the module-level :class PrimeCache:, or a set copy of its primes if :param as_set:=True."""
     if as_set:
-        return CACHED_PRIMES
+        return set(CACHED_PRIMES)
     else:
-        return CACHED_PRIMES_L
+        return CACHED_PRIMES
 
 
-def sieve_primes(max_prime=None, num_primes=None):
+def _extend_prime_cache(max_prime=None, num_primes=None, workers=None):
+    """Extend the prime cache as required by :func sieve_primes:, and return the number of primes requested."""
     if (not max_prime and not num_primes):
         raise TypeError("Must provide an integer for at least one of :max_prime: or :num_primes:")
 
-    # Check cache before calculating
-    if max_prime and max_prime <= CACHED_PRIMES_L[-1]:
-        return [p for p in CACHED_PRIMES_L if p <= max_prime]
-    elif num_primes and num_primes <= len(CACHED_PRIMES):
-        return CACHED_PRIMES_L[:num_primes]
-
-    # Special case for 2 since we don't want to deal with even numbers
-    elif max_prime == 2 or num_primes == 1:
-        return [2]
+    if max_prime:
+        CACHED_PRIMES.extend(int(max_prime) + 1, workers=workers)
+        return CACHED_PRIMES.pi(max_prime)
+    elif CACHED_PRIMES.available(num_primes) < num_primes:
+        CACHED_PRIMES.extend(_estimate_prime_limit(num_primes), workers=workers)
+    return CACHED_PRIMES.available(num_primes)
 
-    # Set starting conditions
-    if CACHED_PRIMES and len(CACHED_PRIMES) > 1:
-        primes = CACHED_PRIMES_L[1:]  # Will reinsert 2 at end
-        test_num = primes[-1] + 2
-    else:
-        primes = [3]  # Will insert 2 at index 0 later
-        test_num = 5
-
-    # Conditions for controlling the loop
-    # Note that for the :num_primes: case, since 2 is left out of the primes, we need one less in the limit
-    condition_basis = test_num if max_prime else len(primes)
-    condition_limit = max_prime + 1 if max_prime else num_primes - 1
-
-    while condition_basis < condition_limit:
-        is_composite = False
-        for p in takewhile(lambda x: x <= sqrt(test_num), primes):
-            if test_num % p == 0:
-                is_composite = True
-                break
-        if not is_composite:
-            primes.append(test_num)
 
-        # XXX: WHY DOES THIS RUN 3 TIMES SLOWER?! (Possibility that python 3.8 might fix it)
-        # filtered_primes = takewhile(lambda x: x <= sqrt(i), primes)
-        # if not any(i % p == 0 for p in filtered_primes):
-        #     primes.append(i)
+def sieve_primes(max_prime=None, num_primes=None, workers=None):
+    """
+    Return list of primes up to :param max_prime: (inclusive), or the first :param num_primes: primes.
 
-        test_num += 2
-        condition_basis = test_num if max_prime else len(primes)
-        condition_limit = max_prime + 1 if max_prime else num_primes - 1
+    Results are cached, so that subsequent calls are served by slicing the cache and extending it only as needed.
+    With :param workers: > 1, large extensions of the cache are sieved by that many processes in parallel.
+    """
+    return CACHED_PRIMES[:_extend_prime_cache(max_prime, num_primes, workers)]
 
-    primes.insert(0, 2)
-    update_prime_cache(primes)
 
-    return primes
+def _sieve_view(max_prime=None, num_primes=None, workers=None):
+    """As :func sieve_primes:, but return a view of the prime cache (see :meth PrimeCache.view:) instead of a list."""
+    return CACHED_PRIMES.view(_extend_prime_cache(max_prime, num_primes, workers))
 
 
 def primes(start_index=0, step=10_000, reverse=False):
-    """Return infinite generator of primes, where :param step: indicates how to compromise performance by looking ahead."""
+    """
+    Return infinite generator of primes, starting from the prime at index :param start_index: of the prime cache.
+
+    The cache is extended by :param step: primes at a time, which indicates how to compromise performance by looking
+    ahead. If :param reverse:=True, the primes within each step are generated in descending order.
+    To generate primes by value (from any starting value, or in fully descending order), see :func primes_between:.
+    """
     assert step >= 3, ":param step: must be at least 3"
+    step = int(step)
 
     low_index = start_index
-
     for i in count(1):
-        # Update cache while getting limits for this step
-        high_index = len(sieve_primes(num_primes=step * i))
-        low_index = max(start_index, low_index)
-
+        # Update cache while getting limits for this step (without converting the cached primes to a list)
+        CACHED_PRIMES.extend(_estimate_prime_limit(step * i))
+        high_index = CACHED_PRIMES.available(step * i)
         if high_index <= low_index:
-            # Either we haven't reached the starting index yet, or the step was too small to find another prime
-
-            # TODO: Test and deploy warning feature
-            # step_failures += 1
-            # if step_failures % 100 == 0:
-            #     warn("step size failing to generate primes in :func primes: with :step:={} ({} skipped steps so far)".format(step, step_failures))
+            # We haven't reached the starting index yet
             continue
 
+        window = CACHED_PRIMES.view(high_index, start=low_index)
+        yield from reversed(window) if reverse else window
+
+        low_index = high_index
+
+
+def primes_between(lo, hi=None, reverse=False):
+    """
+    Return generator of primes p in the range lo <= p < hi (unbounded above if :param hi:=None).
+
+    Primes are sieved from the range one segment at a time, in ascending order or, if :param reverse:=True,
+    descending from :param hi: (which is then required). Memory use is bounded by the segment size: nothing below
+    :param lo: is sieved, and only the base primes up to sqrt(hi) are taken from (and added to) the prime cache.
+    """
+    if reverse and hi is None:
+        raise TypeError("Must provide an upper bound :hi: for descending iteration")
+
+    lo = max(lo, 2)
+    if hi is not None and hi <= lo:
+        return
+    elif lo == 2 and not reverse:
+        yield 2
+
+    # Segments cover odd numbers only, starting from the first odd number in the range
+    segment_span = 2 * SEGMENT_SIZE
+    if hi is None:
+        segment_starts = count(lo | 1, segment_span)
+    elif reverse:
+        segment_starts = reversed(range(lo | 1, hi, segment_span))
+    else:
+        segment_starts = range(lo | 1, hi, segment_span)
+
+    base_limit = 0
+    for segment_lo in segment_starts:
+        segment_hi = segment_lo + segment_span if hi is None else min(segment_lo + segment_span, hi)
+        root = isqrt(segment_hi - 1)
+        if root > base_limit:
+            # When unbounded above, look ahead so that the base primes are not refreshed for every segment
+            base_limit = 2 * root if hi is None else isqrt(hi - 1)
+            base_primes = _sieve_view(max_prime=base_limit)[1:]
+
+        segment = _sieve_segment(segment_lo, segment_hi, base_primes)
         if reverse:
-            # Start at the top of each step range
-            # NOTE: For reverse order slicing of the prime cache, the high_index is off by one
-            high_index -= 1
-            if not low_index:
-                for p in CACHED_PRIMES_L[high_index::-1]:
-                    yield p
+            yield from compress(reversed(range(segment_lo, segment_hi, 2)), reversed(segment))
+        else:
+            yield from compress(range(segment_lo, segment_hi, 2), segment)
 
-            else:
-                for p in CACHED_PRIMES_L[high_index:low_index:-1]:
-                    yield p
+    if lo == 2 and reverse:
+        yield 2
+
+
+# Prime counting tools
+def _lucy_hedgehog(x, sums=False, dtype=np.int64):
+    """
+    Return the number of primes up to x (or their sum, if :param sums:=True), by the Lucy_Hedgehog algorithm.
+
+    For every value v = x // i, S(v) starts as the count (or sum) of all integers 2..v. Sieving by each prime p up
+    to sqrt(x) then removes the integers whose smallest prime factor is p, using S(v // p) - S(p - 1) (weighted by p
+    for sums). Values v < sqrt(x) are kept in an array indexed by v, and values v = x // i by i, so that each
+    prime is handled by a few vectorized updates over these arrays, largest v first.
 
+    :param dtype: is the dtype used for the values of S: sums overflow int64 for x beyond 2**32, and can be taken
+        modulo 2**64 with np.uint64 (see :func prime_sum:), approximated with np.float64 or computed exactly (but
+        more slowly) with object.
+    """
+    r = isqrt(x)
+    indices = np.arange(r + 1, dtype=np.int64)
+    small = indices.astype(dtype)
+    large = np.zeros(r + 1, dtype=np.int64)
+    large[1:] = x // indices[1:]
+    large = large.astype(dtype)
+
+    # Initialize S(v) as the count (or sum) of 2, 3,..., v
+    for values in (small, large):
+        if not sums:
+            values -= 1
+        elif dtype == np.float64:
+            values[:] = values * (values + 1) / 2 - 1
         else:
-            for p in CACHED_PRIMES_L[low_index:high_index]:
-                yield p
-                low_index = p
+            # Halve whichever of v and v + 1 is even, so that the product can be taken modulo 2**64
+            values[:] = np.where(values % 2 == 0, (values // 2) * (values + 1), values * ((values + 1) // 2)) - 1
+
+    for p in _sieve_view(max_prime=r):
+        weight = p if sums else 1
+        below_p = small[p - 1]
+        # Update S(x // i) for all i with x // i >= p**2, where S(x // (i*p)) is in :large: if i*p <= r
+        i_max = min(r, x // (p * p))
+        i_split = min(i_max, r // p)
+        large[1:i_split + 1] -= weight * (large[p:i_split * p + 1:p] - below_p)
+        if i_max > i_split:
+            large[i_split + 1:i_max + 1] -= weight * (small[x // (indices[i_split + 1:i_max + 1] * p)] - below_p)
+        if p * p <= r:
+            small[p * p:] -= weight * (small[indices[p * p:] // p] - below_p)
+
+    return large[1]
+
+
+def prime_pi(x):
+    """Return the number of primes up to x, in O(x**(3/4)) time without enumerating them (see :func _lucy_hedgehog:)."""
+    if x < 2:
+        return 0
+    return int(_lucy_hedgehog(int(x)))
 
-        low_index = high_index
+
+def prime_sum(x):
+    """Return the sum of all primes up to x, in O(x**(3/4)) time without enumerating them."""
+    x = int(x)
+    if x < 2:
+        return 0
+    elif x < 1 << 32:
+        return int(_lucy_hedgehog(x, sums=True))
+    elif x <= 10**14:
+        # The exact sum modulo 2**64 pins down a floating point approximation, whose error is far below 2**63 here
+        residue = int(_lucy_hedgehog(x, sums=True, dtype=np.uint64))
+        approximation = float(_lucy_hedgehog(x, sums=True, dtype=np.float64))
+        return residue + round((approximation - residue) / 2**64) * 2**64
+    else:
+        return _lucy_hedgehog(x, sums=True, dtype=object)
+
+
+def nth_prime(n):
+    """Return the nth prime, counting from nth_prime(1) = 2."""
+    if n < 1:
+        raise ValueError("Must provide a positive integer")
+    elif n < NTH_PRIME_SIEVE_LIMIT:
+        return _sieve_view(num_primes=n)[-1]
+
+    # Estimate the nth prime by Cipolla's asymptotic expansion, then count primes up to the estimate
+    log_n = log(n)
+    log_log_n = log(log_n)
+    estimate = int(n * (log_n + log_log_n - 1 + (log_log_n - 2) / log_n))
+    count = prime_pi(estimate)
+
+    # Finish with a segmented sieve either side of the estimate
+    if count >= n:
+        return next(islice(primes_between(2, estimate + 1, reverse=True), count - n, None))
+    else:
+        return next(islice(primes_between(estimate + 1), n - count - 1, None))
 
 
 # Factoring tools
-@lru_cache(maxsize=None)
+class SmallestPrimeFactors:
+    """
+    Table of the smallest prime factor of every integer up to :param limit:, for factoring in O(log n) steps.
+
+    The table is a NumPy uint32 array (with 0 for the entries 0 and 1), also exposed through a memoryview for fast
+    access to single entries.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.table = np.zeros(limit + 1, dtype=np.uint32)
+
+        # Mark multiples of each prime, from largest to smallest so that the smallest factor is marked last
+        for p in reversed(_sieve_view(max_prime=isqrt(limit))):
+            self.table[p * p::p] = p
+
+        # Integers left unmarked are prime, and are their own smallest prime factor
+        unmarked = np.flatnonzero(self.table == 0)[2:]
+        self.table[unmarked] = unmarked
+        self._view = memoryview(self.table)
+
+    def __getitem__(self, n):
+        return self._view[n]
+
+    def factor(self, n):
+        """Return dict of prime factorization of n, in the form returned by :func prime_factors:."""
+        factors = dict()
+        spf = self._view
+        while n > 1:
+            p = spf[n]
+            n //= p
+            factor_count = 1
+            while spf[n] == p:
+                n //= p
+                factor_count += 1
+            factors[p] = factor_count
+
+        return factors
+
+
+# A cached table of smallest prime factors (see :func sieve_smallest_factors:)
+CACHED_SPF = None
+
+
+def sieve_smallest_factors(limit):
+    """
+    Return a :class SmallestPrimeFactors: table covering all integers up to :param limit:.
+
+    The table is cached, and used by :func prime_factors: (and so everything built on it) for any n in its range.
+    """
+    global CACHED_SPF
+    if CACHED_SPF is None or CACHED_SPF.limit < limit:
+        CACHED_SPF = SmallestPrimeFactors(limit)
+    return CACHED_SPF
+
+
+def clear_spf_cache():
+    global CACHED_SPF
+    CACHED_SPF = None
+
+
 def reduce_by_factor(n, reduct):
     n_reduced = n
     reduct_count = 0
@@ -133,36 +743,86 @@ def reduce_by_factor(n, reduct):
     return (n_reduced, reduct_count)
 
 
-@lru_cache(maxsize=None)
+def pollard_brent(n):
+    """
+    Return a nontrivial factor of the composite number n, by Pollard's rho algorithm with Brent's cycle detection.
+
+    Differences along the pseudorandom sequence are multiplied together in batches, so that only one GCD is
+    computed per batch.
+    """
+    if not n & 1:
+        return 2
+    root = isqrt(n)
+    if root * root == n:
+        return root
+
+    batch_size = 128
+    for c in count(1):
+        # Iterate y -> y**2 + c (mod n), comparing y against a saved value x that is reset at powers of 2 steps
+        y, r, q, g = 2, 1, 1, 1
+        while g == 1:
+            x = y
+            for _ in range(r):
+                y = (y * y + c) % n
+            k = 0
+            while k < r and g == 1:
+                y_saved = y
+                for _ in range(min(batch_size, r - k)):
+                    y = (y * y + c) % n
+                    q = q * (x - y) % n
+                g = gcd(q, n)
+                k += batch_size
+            r *= 2
+
+        if g == n:
+            # The batch overshot, so retrace it one step at a time
+            g = 1
+            while g == 1:
+                y_saved = (y_saved * y_saved + c) % n
+                g = gcd(x - y_saved, n)
+
+        if g != n:
+            return g
+        # Otherwise the sequence cycled mod n without splitting it, so retry with another constant
+
+
+@bounded_cache()
 def prime_factors(n):
-    """Return dict of prime factorization of n, in the form {prime_i: power_i} for primes [prime_1, prime_2,...]."""
+    """
+    Return dict of prime factorization of n, in the form {prime_i: power_i} for primes [prime_1, prime_2,...].
+
+    Small factors are found by trial division by cached primes (or by a :class SmallestPrimeFactors: table, if one
+    covers n). Larger cofactors are tested with :func is_prime:, and split by :func pollard_brent: if composite.
+    """
     if n < 2:
         return {}
+    elif CACHED_SPF is not None and n <= CACHED_SPF.limit:
+        return CACHED_SPF.factor(n)
 
     factors = dict()
+    for p in _sieve_view(max_prime=FACTOR_TRIAL_LIMIT):
+        if p * p > n:
+            break
+        n_div_p, n_mod_p = divmod(n, p)
+        while n_mod_p == 0:
+            factors[p] = factors.get(p, 0) + 1
+            n = n_div_p
+            n_div_p, n_mod_p = divmod(n, p)
+
+    # Any remaining cofactor has no prime factors up to FACTOR_TRIAL_LIMIT
+    cofactors = [n] if n > 1 else []
+    while cofactors:
+        m = cofactors.pop()
+        if m < FACTOR_TRIAL_LIMIT**2 or is_prime(m):
+            factors[m] = factors.get(m, 0) + 1
+        else:
+            d = pollard_brent(m)
+            cofactors.extend((d, m // d))
 
-    # Special case 2
-    n_reduced, factor_count = reduce_by_factor(n, 2)
-    if factor_count:
-        factors[2] = factor_count
-    # Special case 3
-    n_reduced, factor_count = reduce_by_factor(n_reduced, 3)
-    if factor_count:
-        factors[3] = factor_count
-
-    # Remaining primes are all of the form 6*k +/- 1
-    k = 1
-    while n_reduced > 1:
-        for test_factor in (6 * k - 1, 6 * k + 1):
-            n_reduced, factor_count = reduce_by_factor(n_reduced, test_factor)
-            if factor_count:
-                factors[test_factor] = factor_count
-        k += 1
-
-    return factors
+    return dict(sorted(factors.items()))
 
 
-@lru_cache(maxsize=None)
+@bounded_cache()
 def prime_factors_precomputed(n):
     """
     Return dict of prime factorization of n, in the form {prime_i: power_i} for primes [prime_1, prime_2,...].
@@ -171,9 +831,11 @@ def prime_factors_precomputed(n):
     """
     if n < 2:
         return {}
+    elif CACHED_SPF is not None and n <= CACHED_SPF.limit:
+        return CACHED_SPF.factor(n)
 
     factors = dict()
-    for p in sieve_primes(max_prime=sqrt(n) + 1):
+    for p in _sieve_view(max_prime=sqrt(n) + 1):
         n, factor_count = reduce_by_factor(n, p)
         if factor_count:
             factors[p] = factor_count
@@ -194,65 +856,249 @@ def cancel_common_factors(i_fact, j_fact):
 
 
 def reduce_factorization(factorization):
-    return reduce(mul, (p**k for p, k in factorization.items()))
+    return reduce(mul, (p**k for p, k in factorization.items()), 1)
+
+
+def iter_divisors(factorization, upper_bound=None, ascending=False):
+    """
+    Return generator of all divisors of a number, given its prime factorization (or the number itself).
+
+    Divisors are built incrementally, multiplying each divisor by powers of primes larger than any prime it already
+    includes, so that every divisor is built exactly once from a smaller one. This allows skipping every divisor
+    that exceeds :param upper_bound:, without building it. If :param ascending:=True, divisors are generated in
+    ascending order, by keeping the divisors waiting to be generated in a heap (otherwise the order is depth-first).
+    """
+    if isinstance(factorization, int):
+        factorization = prime_factors(factorization)
+    prime_powers = sorted(factorization.items())
+
+    # Each divisor is stored with the index of the next prime that may be multiplied into it
+    pending = [(1, 0)] if upper_bound is None or upper_bound >= 1 else []
+    pop, push = (heappop, heappush) if ascending else (list.pop, list.append)
+    while pending:
+        d, i = pop(pending)
+        yield d
+        for j in range(i, len(prime_powers)):
+            p, k = prime_powers[j]
+            if upper_bound is not None and d * p > upper_bound:
+                # Primes are in ascending order, so no later prime fits under the bound either
+                break
+            multiple = d
+            for _ in range(k):
+                multiple *= p
+                if upper_bound is not None and multiple > upper_bound:
+                    break
+                push(pending, (multiple, j + 1))
+
+
+def num_divisors(factorization, upper_bound=None):
+    """
+    Return the number of divisors of a number, given its prime factorization (or the number itself).
+
+    Without :param upper_bound: this is the product of (k + 1) over prime powers p**k. Otherwise, divisors up to the
+    bound are counted as in :func iter_divisors:, without building a list of them.
+    """
+    if isinstance(factorization, int):
+        factorization = prime_factors(factorization)
+    if upper_bound is None:
+        return reduce(mul, (k + 1 for k in factorization.values()), 1)
+    return sum(1 for _ in iter_divisors(factorization, upper_bound=upper_bound))
 
 
 def generate_divisors(factorization):
-    raised_factors = []
-    for k, v in factorization.items():
-        raised_factors.append([k**i for i in range(v + 1)])
+    """
+    Return list of proper divisors of a number, given its prime factorization (or the number itself).
 
-    # Generate all possible products of prime factors to get all proper divisors
-    product_components = product(*raised_factors)
-    divisors = [reduce(mul, components) for components in product_components]
+    NOTE: Divisors are listed in no particular order (see :func iter_divisors: for ordered or bounded divisors).
+    """
+    if isinstance(factorization, int):
+        factorization = prime_factors(factorization)
+
+    divisors = list(iter_divisors(factorization))
     # Remove original number from divisor list
-    divisors = divisors[:-1]
+    divisors.remove(reduce_factorization(factorization))
     return divisors
 
 
+# Sieves of arithmetic functions over a range, returning NumPy arrays of values for each integer 0 <= n <= limit
+def _sieve_multiplicative(limit, prime_power_value, dtype):
+    """
+    Return array of f(n) for 0 <= n <= :param limit:, for the multiplicative function f with f(p**k) given by
+    :param prime_power_value:(p, k). The value for 0 is left as 1.
+
+    Primes up to sqrt(limit) are handled by strided updates over their multiples. What remains of each n after
+    dividing those out is either 1 or a single larger prime, and is handled by a final vectorized pass.
+    """
+    values = np.ones(limit + 1, dtype=dtype)
+    cofactors = np.arange(limit + 1, dtype=np.int64)
+
+    for p in _sieve_view(max_prime=isqrt(limit)):
+        # Index m - 1 of this slice represents the multiple m*p, which has exact exponent k when p**(k-1) divides m
+        prime_power_values = np.full(limit // p, prime_power_value(p, 1), dtype=dtype)
+        cofactors[p::p] //= p
+        p_k, k = p * p, 2
+        while p_k <= limit:
+            prime_power_values[p_k // p - 1::p_k // p] = prime_power_value(p, k)
+            cofactors[p_k::p_k] //= p
+            p_k *= p
+            k += 1
+        values[p::p] *= prime_power_values
+
+    large_primes = cofactors > 1
+    values[large_primes] *= prime_power_value(cofactors[large_primes], 1).astype(dtype)
+    return values
+
+
+def sieve_phi(limit):
+    """Return array of Euler's totient function phi(n), for 0 <= n <= :param limit:."""
+    phis = _sieve_multiplicative(limit, lambda p, k: p**(k - 1) * (p - 1), np.int64)
+    phis[0] = 0
+    return phis
+
+
+def sieve_sigma(limit):
+    """Return array of the sum of all divisors of n (including n itself), for 0 <= n <= :param limit:."""
+    sigmas = _sieve_multiplicative(limit, lambda p, k: (p**(k + 1) - 1) // (p - 1), np.int64)
+    sigmas[0] = 0
+    return sigmas
+
+
+def sieve_num_divisors(limit):
+    """Return array of the number of divisors of n, for 0 <= n <= :param limit:."""
+    counts = _sieve_multiplicative(limit, lambda p, k: np.full_like(p, k + 1), np.int32)
+    counts[0] = 0
+    return counts
+
+
+def sieve_mobius(limit):
+    """Return array of the Mobius function mu(n), for 0 <= n <= :param limit:."""
+    mus = _sieve_multiplicative(limit, lambda p, k: np.full_like(p, -1 if k == 1 else 0), np.int8)
+    mus[0] = 0
+    return mus
+
+
+def sieve_omega(limit):
+    """Return array of the number of distinct prime factors of n, for 0 <= n <= :param limit:."""
+    omegas = np.zeros(limit + 1, dtype=np.int8)
+    cofactors = np.arange(limit + 1, dtype=np.int64)
+    for p in _sieve_view(max_prime=isqrt(limit)):
+        omegas[p::p] += 1
+        p_k = p
+        while p_k <= limit:
+            cofactors[p_k::p_k] //= p
+            p_k *= p
+
+    # Anything left over is a single prime larger than sqrt(limit)
+    omegas[cofactors > 1] += 1
+    return omegas
+
+
+def totient(n):
+    """Return Euler's totient function phi(n), the number of positive integers up to n that are coprime to n."""
+    return reduce(mul, (p**(k - 1) * (p - 1) for p, k in prime_factors(n).items()), 1)
+
+
 # Miscellaneous
-def is_prime(n, cache_primes=True):
+def _is_prime_by_wheel(n):
+    """Return True if n is prime, by trial division with a 2-3-5 wheel."""
+    for p in (2, 3, 5):
+        if n % p == 0:
+            return n == p
+
+    # Candidate factors are coprime to 30, stepping through the residues 7, 11, 13, 17, 19, 23, 29, 31 (mod 30)
+    test_factor = 7
+    for step in cycle((4, 2, 4, 2, 4, 6, 2, 6)):
+        if test_factor * test_factor > n:
+            return n > 1
+        elif n % test_factor == 0:
+            return False
+        test_factor += step
+
+
+def is_prime(n, cache_primes=False):
     """Return True if n is prime, and otherwise False.
 
+    The test depends on the size of n: values in the range of the prime cache are looked up in its bit-vector,
+    small values are checked by trial division, and larger values by deterministic Miller-Rabin (or Baillie-PSW
+    beyond the deterministic range of :func miller_rabin:).
+
     Parameters:
         :int n: integer to test for primality
-        :bool cache_primes: If True, generates all primes up `n` to test primality. If you plan on testing many primes then this can be exploited for performance gains by testing large primes first.
+        :bool cache_primes: If True, extends the prime cache up to `n` to test primality. This can pay off when
+            testing many values up to a known bound (or when sieving all primes up to n is needed anyway), but by
+            default the cache is never grown by a primality test.
     """
+    if not isinstance(n, int):
+        # Accept NumPy integers, and floats with integral values
+        if n != int(n):
+            return False
+        n = int(n)
+
     if n < 2:
         return False
+    elif n < CACHED_PRIMES.limit:
+        return n in CACHED_PRIMES
     elif cache_primes:
-        if n <= CACHED_PRIMES_L[-1]:
-            if n in CACHED_PRIMES:
-                return True
-            else:
-                return False
-        elif n in sieve_primes(max_prime=n):
-            return True
-        else:
-            return False
+        CACHED_PRIMES.extend(n + 1)
+        return n in CACHED_PRIMES
+    elif n < TRIAL_DIVISION_LIMIT:
+        return _is_prime_by_wheel(n)
+    elif n < MILLER_RABIN_BASES[-1][0]:
+        return miller_rabin(n)
     else:
-        # Special case 2 and 3
-        if n in (2, 3):
-            return True
-        elif n % 2 == 0 or n % 3 == 0:
-            return False
-        else:
-            # Remaining primes are all of the form 6*k +/- 1
-            for k in range(1, int(sqrt(n) + 1) // 6 + 1):
-                for test_factor in (6 * k - 1, 6 * k + 1):
-                    if n % test_factor == 0:
-                        return False
+        return baillie_psw(n)
 
-    return True
 
+def is_prime_many(values, workers=None):
+    """
+    Return NumPy boolean array marking the primes among :param values: (any iterable or array of integers).
+
+    Values are split by magnitude: those in the range of the prime cache are looked up in its bit-vector, and the
+    rest are trial divided together by primes below :data BATCH_TRIAL_LIMIT:. Values that survive trial division are
+    tested together by Miller-Rabin in NumPy, if they are below :data BATCH_MILLER_RABIN_LIMIT:. Only larger values
+    (or too few to batch) are tested one by one with :func is_prime:.
+    With :param workers: > 1, those are shared out to a pool of processes if there are many of them.
+    """
+    values = values if isinstance(values, np.ndarray) else np.array(list(values))
+    shape, values = values.shape, values.ravel()
+    result = np.zeros(values.shape, dtype=bool)
+    if values.dtype == object or len(values) < MIN_TRIAL_BATCH_SIZE:
+        # Python ints too large for machine integers, or too few values to be worth the overhead of NumPy
+        untested = np.arange(len(values))
+    else:
+        trial_primes = _sieve_view(max_prime=BATCH_TRIAL_LIMIT)
+        cached = (values >= 2) & (values < CACHED_PRIMES.limit)
+        result[cached] = CACHED_PRIMES.contains_many(values[cached])
 
-@lru_cache(maxsize=None)
-def gcd(x, y):
-    "Return the greatest common divisor of x and y."
-    if x == 0:
-        return y
+        untested = np.flatnonzero(values >= max(2, CACHED_PRIMES.limit))
+        for p in trial_primes:
+            if len(untested) < MIN_TRIAL_BATCH_SIZE:
+                break
+            # Each prime settles the untested values it divides, and those below its square
+            candidates = values[untested]
+            divisible = candidates % p == 0
+            result[untested[divisible]] = candidates[divisible] == p
+            settled = divisible | (candidates < p * p)
+            result[untested[~divisible & settled]] = True
+            untested = untested[~settled]
+        else:
+            # Values left after trial division by every prime are odd and above the bases, so that those below the
+            # bound can be settled together, with bases that make Miller-Rabin deterministic there
+            batch = untested[values[untested] < BATCH_MILLER_RABIN_LIMIT]
+            if len(batch) >= MIN_TRIAL_BATCH_SIZE:
+                bases = next(bases for bound, bases in MILLER_RABIN_BASES if bound > BATCH_MILLER_RABIN_LIMIT)
+                result[batch] = np.logical_and.reduce([_strong_probable_primes(values[batch], a) for a in bases])
+                untested = untested[values[untested] >= BATCH_MILLER_RABIN_LIMIT]
+
+    candidates = values[untested].tolist()
+    if workers and workers > 1 and len(candidates) >= PARALLEL_BATCH_SIZE:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            tested = list(executor.map(is_prime, candidates, chunksize=-(-len(candidates) // (4 * workers))))
     else:
-        return gcd(y % x, x)
+        tested = list(map(is_prime, candidates))
+    result[untested] = tested
+
+    return result.reshape(shape)
 
 
 def is_coprime(x, y):
@@ -260,74 +1106,347 @@ def is_coprime(x, y):
     Return True if x and y are coprimes (relatively prime to each other).
 
     Two integers, x and y, are coprime if their greatest common divisor is 1; i.e., gcd(x,y)=1.
+    NOTE: :func gcd: is `math.gcd`, re-exported from this module.
     """
-    # Try to solve for a and b such that a*x + b*y = 1; i.e., y = 1/b + (a/b)*x
     return gcd(x, y) == 1
 
 
-def miller_rabin(n, sample_size=None):
+def gcd_many(xs, ys):
+    """Return NumPy array of the greatest common divisors of corresponding elements of xs and ys (or broadcasts)."""
+    return np.gcd(np.asarray(xs), np.asarray(ys))
+
+
+def coprime_mask(n, ks):
+    """Return NumPy boolean array marking the elements of ks that are coprime to n."""
+    return np.gcd(np.asarray(ks), n) == 1
+
+
+# Prime pairs
+def _concat_multipliers(values):
+    """Return NumPy array of the least powers of 10 exceeding each of :param values:, for concatenating digits."""
+    multipliers = np.full(len(values), 10, dtype=np.int64)
+    while (short := multipliers <= values).any():
+        multipliers[short] *= 10
+    return multipliers
+
+
+def prime_pair_graph(max_prime, sieve_limit=PAIR_SIEVE_LIMIT):
     """
-    Return True if n is probably prime, by Miller-Rabin test.
+    Return list of primes below :param max_prime: (besides 2 and 5) and their adjacency bitsets, where bit j of
+    adjacency[i] is set if concatenating primes i and j in either order produces a prime.
 
-    WIP: DO NOT USE FOR n<10_000
+    Concatenations are built arithmetically, as p * 10**num_digits(q) + q. Only primes in the same residue class
+    modulo 3 can pair, since otherwise the digit sum of a concatenation is divisible by 3, so each prime is only
+    tested against smaller primes in its own class (and 3). Those candidates are tested in large batches: by
+    lookup in the prime cache, which is extended to cover all concatenations if they lie below :param sieve_limit:,
+    and otherwise by :func is_prime_many:.
 
-    Typically, a sample size should only be given for numbers greater than 3.14 * 10**14.
-    Otherwise, sampling is based on a known result
-    (see https://mathworld.wolfram.com/Rabin-MillerStrongPseudoprimeTest.html)
+    NOTE: The graph can be searched for prime pair sets with :mod lib.graph: (e.g., :func min_weight_clique:).
     """
-    if n < 2:
-        return False
-    elif n in (2, 3, 5):
+    vertices = [p for p in primes_between(3, max_prime) if p != 5]
+    adjacency = [0] * len(vertices)
+    if len(vertices) < 2:
+        return vertices, adjacency
+
+    values = np.array(vertices, dtype=np.int64)
+    multipliers = _concat_multipliers(values)
+    max_concat = vertices[-1] * int(multipliers[-1]) + vertices[-1]
+    if max_concat < max(sieve_limit, CACHED_PRIMES.limit):
+        CACHED_PRIMES.extend(max_concat + 1)
+        test_batch = CACHED_PRIMES.contains_many
+    else:
+        if max_concat >= 1 << 63:
+            # Python ints do not overflow
+            values, multipliers = values.astype(object), multipliers.astype(object)
+        test_batch = is_prime_many
+
+    # Partition by residue modulo 3, where 3 (vertex 0) belongs with both other classes
+    residues = values % 3
+    for residue in (1, 2):
+        members = np.concatenate(([0], np.flatnonzero(residues == residue)))
+        # Member t pairs with the t members before it, so each batch takes the pairs of a run of members [t, u)
+        pair_counts = np.cumsum(np.arange(len(members)))
+        t = 1
+        while t < len(members):
+            u = min(int(np.searchsorted(pair_counts, pair_counts[t - 1] + PAIR_BATCH_SIZE)) + 1, len(members))
+            lengths = np.arange(t, u)
+            rows = np.repeat(members[t:u], lengths)
+            cols = members[np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)]
+
+            paired = test_batch(values[rows] * multipliers[cols] + values[cols])
+            rows, cols = rows[paired], cols[paired]
+            paired = test_batch(values[cols] * multipliers[rows] + values[rows])
+            for i, j in zip(rows[paired].tolist(), cols[paired].tolist()):
+                adjacency[i] |= 1 << j
+                adjacency[j] |= 1 << i
+            t = u
+
+    return vertices, adjacency
+
+
+# Digit families
+# Digits that can end a prime of two or more digits, and so fill every position of a circular or permutable prime
+PRIME_END_DIGITS = (1, 3, 7, 9)
+
+
+def right_truncatable_primes(max_digits=None):
+    """
+    Return generator of primes that remain prime as digits are removed from the right (e.g., 3797, 379, 37, 3),
+    in ascending order, up to :param max_digits: digits (default, all 83 of them).
+
+    Primes of each length are built by appending digits 1, 3, 7 or 9 to those one digit shorter.
+    NOTE: Single digit primes are included.
+    """
+    level = [2, 3, 5, 7]
+    num_digits = 1
+    while level and (max_digits is None or num_digits <= max_digits):
+        yield from level
+        level = [p for q in level for p in range(10 * q + 1, 10 * q + 10, 2) if p % 5 and is_prime(p)]
+        num_digits += 1
+
+
+def left_truncatable_primes(max_digits=None):
+    """
+    Return generator of primes with no zero digits that remain prime as digits are removed from the left (e.g.,
+    3797, 797, 97, 7), in ascending order, up to :param max_digits: digits (default, all 4260 of them).
+
+    Primes of each length are built by prepending digits 1-9 to those one digit shorter.
+    NOTE: Single digit primes are included.
+    """
+    level = [2, 3, 5, 7]
+    num_digits, power = 1, 10
+    while level and (max_digits is None or num_digits <= max_digits):
+        yield from level
+        level = sorted(p for d in range(power, 10 * power, power) for q in level if is_prime(p := d + q))
+        num_digits, power = num_digits + 1, 10 * power
+
+
+def _necklaces(length, num_symbols):
+    """
+    Return generator of the lists of symbols 0, ..., num_symbols - 1 that are the least of their rotations.
+
+    Uses Duval's algorithm, which generates Lyndon words (aperiodic necklaces) of up to :param length: symbols in
+    lexicographic order, where those with lengths dividing :param length: repeat to give every necklace.
+    """
+    word = [-1]
+    while word:
+        word[-1] += 1
+        period = len(word)
+        if length % period == 0:
+            yield word * (length // period)
+        while len(word) < length:
+            word.append(word[-period])
+        while word and word[-1] == num_symbols - 1:
+            word.pop()
+
+
+def circular_primes(max_digits):
+    """
+    Return generator of primes with up to :param max_digits: digits for which every rotation of the digits is also
+    prime (e.g., 197, 971 and 719), in ascending order.
+
+    Beyond one digit, candidates are built only from the digits 1, 3, 7 and 9, since any other digit would end some
+    rotation. Each cycle of rotations is generated once, as a necklace, and skipped if its digit sum is divisible by
+    3. The rotations of all candidates of each length are then trial divided together in NumPy, leaving only a few
+    candidates to test fully with :func is_prime:.
+    """
+    yield from (p for p in (2, 3, 5, 7) if max_digits >= 1)
+    for num_digits in range(2, max_digits + 1):
+        necklaces = chain.from_iterable(_necklaces(num_digits, len(PRIME_END_DIGITS)))
+        digits = np.array(PRIME_END_DIGITS)[np.fromiter(necklaces, dtype=np.intp).reshape(-1, num_digits)]
+        digits = digits[digits.sum(axis=1) % 3 != 0]
+        power = 10 ** (num_digits - 1)
+        rotations = [digits @ 10 ** np.arange(num_digits - 1, -1, -1, dtype=np.int64)]
+        for _ in range(num_digits - 1):
+            rotations.append(rotations[-1] % power * 10 + rotations[-1] // power)
+        rotations = np.stack(rotations, axis=1)
+
+        # Trial divide by primes with fewer digits, which cannot be rotations themselves
+        for p in _sieve_view(max_prime=min(power, 1 << 10))[3:]:
+            rotations = rotations[(rotations % p).all(axis=1)]
+
+        found = set()
+        for candidate in rotations.tolist():
+            if all(is_prime(n) for n in candidate):
+                found.update(candidate)
+
+        yield from sorted(found)
+
+
+def permutable_primes(max_digits):
+    """
+    Return generator of primes with up to :param max_digits: digits for which every permutation of the digits is
+    also prime (e.g., 337, 373 and 733), in ascending order.
+
+    Beyond one digit, candidates are drawn only from multisets of the digits 1, 3, 7 and 9, as for
+    :func circular_primes:, and each multiset is rejected at its first composite permutation.
+    """
+    yield from (p for p in (2, 3, 5, 7) if max_digits >= 1)
+    for num_digits in range(2, max_digits + 1):
+        found = []
+        for multiset in combinations_with_replacement(PRIME_END_DIGITS, num_digits):
+            if sum(multiset) % 3 == 0:
+                continue
+
+            orderings = []
+            for digits in multiset_permutations(multiset):
+                n = reduce(lambda n, d: 10 * n + d, digits)
+                if not is_prime(n):
+                    break
+                orderings.append(n)
+            else:
+                found.extend(orderings)
+
+        yield from sorted(found)
+
+
+def _strong_probable_primes(values, a):
+    """
+    Return NumPy boolean array marking the strong probable primes to base a among an array of odd values above a,
+    below :data BATCH_MILLER_RABIN_LIMIT: (as for :func _is_strong_probable_prime:, for each value at once).
+    """
+    n = values.astype(np.uint64)
+    one = np.uint64(1)
+
+    # Express n - 1 as 2**s * d, with d odd
+    d, s = n - one, np.zeros(n.shape, dtype=np.int64)
+    even = (d & one) == 0
+    while even.any():
+        d[even] >>= one
+        s[even] += 1
+        even = (d & one) == 0
+
+    # Raise a to the power d modulo n, by squaring and multiplying for each bit of d
+    x, power = np.ones_like(n), np.uint64(a) % n
+    while d.any():
+        x = np.where(d & one, x * power % n, x)
+        power = power * power % n
+        d >>= one
+
+    n_minus_1 = n - one
+    passed = (x == one) | (x == n_minus_1)
+    for r in range(1, int(s.max(initial=0))):
+        x = x * x % n
+        passed |= (x == n_minus_1) & (r < s)
+    return passed
+
+
+def _is_strong_probable_prime(n, d, s, a):
+    """Return True if n is a strong probable prime to base a, where n - 1 = 2**s * d with d odd."""
+    x = pow(a, d, n)
+    if x == 1 or x == n - 1:
         return True
-    elif n % 2 == 0 or n % 3 == 0 or n % 5 == 0:
+    for _ in range(s - 1):
+        x = x * x % n
+        if x == n - 1:
+            return True
+    return False
+
+
+def jacobi(a, n):
+    """Return the Jacobi symbol (a/n), for odd positive n."""
+    a %= n
+    result = 1
+    while a:
+        while not a & 1:
+            a >>= 1
+            if n & 7 in (3, 5):
+                result = -result
+        a, n = n, a
+        if a & 3 == 3 and n & 3 == 3:
+            result = -result
+        a %= n
+    return result if n == 1 else 0
+
+
+def _is_strong_lucas_probable_prime(n):
+    """Return True if odd n > 2 is a strong Lucas probable prime, with parameters chosen by Selfridge's method."""
+    if isqrt(n) ** 2 == n:
+        # No suitable D exists for perfect squares
         return False
-    elif n < 11:
-        # 7 is all that's left under 11
-        return True
 
-    # Set up variables for Miller-Rabin (expressing n-1 as 2^k * d, with d odd)
-    n_decr = n - 1
-    k = 1
-    d = n_decr // 2
-    while d % 2 == 0:
-        d = d // 2
-        k += 1
-
-    # Get test case samples
-    if sample_size:
-        # Take random sample
-        test_sample = sample(range(2, n_decr), sample_size)
-    else:
-        # Take first 7 primes
-        test_sample = sieve_primes(num_primes=7)
-
-    # In the following section, all branches that return False are deterministic,
-    # but any other outcome means that n is only PROBABLY prime
-    for test_case in test_sample:
-        # Fermat
-        if test_case ** n_decr % n != 1:
-            # Definitely not prime
+    # Take the first D in the sequence 5, -7, 9, -11, ... for which the Jacobi symbol (D/n) is -1
+    D = 5
+    while (j := jacobi(D, n)) != -1:
+        if j == 0 and abs(D) != n:
             return False
+        D = -D - 2 if D > 0 else -D + 2
+    P, Q = 1, (1 - D) // 4
+
+    # Express n + 1 as 2**s * d, with d odd
+    d, s = n + 1, 0
+    while not d & 1:
+        d >>= 1
+        s += 1
+
+    # Compute U_d and V_d (and Q**d) by binary expansion of d, where halving is multiplication by the inverse of 2
+    half = (n + 1) // 2
+    U, V, Q_k = 1, P, Q
+    for bit in bin(d)[3:]:
+        U, V, Q_k = U * V % n, (V * V - 2 * Q_k) % n, Q_k * Q_k % n
+        if bit == '1':
+            U, V, Q_k = (P * U + V) * half % n, (D * U + P * V) * half % n, Q_k * Q % n
+
+    if U == 0 or V == 0:
+        return True
+    for _ in range(s - 1):
+        V, Q_k = (V * V - 2 * Q_k) % n, Q_k * Q_k % n
+        if V == 0:
+            return True
+    return False
 
-        # Miller-Rabin
-        if test_case ** d % n in (1, n_decr):
-            # Probably prime
-            continue
 
-        if k == 1:
-            return False
+def baillie_psw(n):
+    """
+    Return True if n is probably prime, by the Baillie-PSW test.
+
+    This combines a strong probable prime test to base 2 with a strong Lucas probable prime test. No composite is
+    known to pass both, and there are none below 2**64.
+    """
+    if n < 2:
+        return False
+    for p in SMALL_PRIMES:
+        if n % p == 0:
+            return n == p
+
+    d, s = n - 1, 0
+    while not d & 1:
+        d >>= 1
+        s += 1
+
+    return _is_strong_probable_prime(n, d, s, 2) and _is_strong_lucas_probable_prime(n)
 
-        skip_end = False
-        for j in range(k - 1):
-            test_power = (test_case ** (2**j) * d) % n
-            if test_power == 1:
-                return False
-            elif test_power == n_decr:
-                # Probably prime
-                skip_end = True
-                break
 
-        if not skip_end and (test_case ** (2**(k - 1)) * d) % n == 1:
+def miller_rabin(n, sample_size=None):
+    """
+    Return True if n is prime, by Miller-Rabin test.
+
+    The test is deterministic for all n < 3.3 * 10**24, using known sets of bases that no composite below each
+    bound passes (see :data MILLER_RABIN_BASES:). Beyond that, or if :param sample_size: is given, a random
+    sample of bases is tested, in which case n is only PROBABLY prime.
+    """
+    if n < 2:
+        return False
+    for p in SMALL_PRIMES:
+        if n % p == 0:
+            return n == p
+    if n < SMALL_PRIMES[-1] ** 2:
+        return True
+
+    # Express n - 1 as 2**s * d, with d odd
+    d, s = n - 1, 0
+    while not d & 1:
+        d >>= 1
+        s += 1
+
+    bases = None if sample_size else next((bases for bound, bases in MILLER_RABIN_BASES if n < bound), None)
+    if bases is None:
+        bases = [randrange(2, n - 1) for _ in range(sample_size or 20)]
+
+    for a in bases:
+        a %= n
+        if a and not _is_strong_probable_prime(n, d, s, a):
+            # Definitely not prime
             return False
 
     return True
@@ -336,10 +1455,10 @@ def miller_rabin(n, sample_size=None):
 def sum_raised_primes(p, power_of_p):
     """Return sum of p raised to each power k, for 1 <= k <= power_of_p."""
     # Given by a closed form expression
-    return int((p**(power_of_p + 1) - 1) / (p - 1))
+    return (p**(power_of_p + 1) - 1) // (p - 1)
 
 
-@lru_cache(maxsize=None)
+@bounded_cache()
 def sum_divisors(n):
     """Return sum of all proper divisors of n (excludes n itself)."""
     if n == 1:
@@ -0,0 +1,53 @@
+from lib.cache import BoundedCache, bounded_cache, cache_stats, clear_all_caches
+
+
+########################
+# Tests
+########################
+
+def test_bounded_cache_eviction():
+    """Check that least recently used entries are evicted once the entry budget is exceeded."""
+    calls = []
+
+    @bounded_cache(maxsize=2)
+    def square(x):
+        calls.append(x)
+        return x * x
+
+    # Caches with only an entry budget are backed by functools.lru_cache
+    assert not isinstance(square, BoundedCache)
+    assert [square(1), square(2), square(1), square(3)] == [1, 4, 1, 9]
+    info = square.cache_info()
+    assert (info.hits, info.misses, info.evictions, info.size) == (1, 3, 1, 2)
+
+    # 2 was least recently used, so it was evicted in favor of 3
+    square(1)
+    square(2)
+    assert calls == [1, 2, 3, 2]
+
+
+def test_bounded_cache_maxbytes():
+    @bounded_cache(maxsize=None, maxbytes=10_000)
+    def padding(n):
+        return bytes(n)
+
+    assert isinstance(padding, BoundedCache)
+    for n in range(100):
+        padding(1_000 + n)
+
+    info = padding.cache_info()
+    assert 0 < info.nbytes <= 10_000
+    assert info.size + info.evictions == 100
+
+
+def test_clear_all_caches():
+    @bounded_cache()
+    def identity(x):
+        return x
+
+    identity(1)
+    identity(1)
+    assert cache_stats()[f"{__name__}.{identity.__qualname__}"].hits == 1
+
+    clear_all_caches()
+    assert identity.cache_info().hits == identity.cache_info().size == 0
@@ -0,0 +1,65 @@
+from itertools import combinations
+from random import Random
+
+import lib.graph as graph
+import pytest
+
+
+########################
+# Test data
+########################
+
+def random_graph(n, density, seed):
+    rng = Random(seed)
+    adjacency = [0] * n
+    for i, j in combinations(range(n), 2):
+        if rng.random() < density:
+            adjacency[i] |= 1 << j
+            adjacency[j] |= 1 << i
+    return adjacency
+
+
+def is_clique(adjacency, vertices):
+    return all(adjacency[i] >> j & 1 for i, j in combinations(vertices, 2))
+
+
+########################
+# Tests
+########################
+
+def test_bitsets():
+    assert graph.to_bitset([]) == 0
+    assert graph.to_bitset([0, 3, 70]) == 1 | 8 | 1 << 70
+    assert list(graph.iter_bits(1 | 8 | 1 << 70)) == [0, 3, 70]
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_iter_cliques(seed):
+    adjacency = random_graph(24, 0.5, seed)
+    for k in (1, 2, 3, 4):
+        expected = [c for c in combinations(range(24), k) if is_clique(adjacency, c)]
+        assert list(graph.iter_cliques(adjacency, k)) == expected
+
+    candidates = graph.to_bitset(range(0, 24, 2))
+    expected = [c for c in combinations(range(0, 24, 2), 3) if is_clique(adjacency, c)]
+    assert list(graph.iter_cliques(adjacency, 3, candidates)) == expected
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_maximal_cliques(seed):
+    adjacency = random_graph(16, 0.5, seed)
+    cliques = [c for k in range(1, 17) for c in combinations(range(16), k) if is_clique(adjacency, c)]
+    expected = {c for c in cliques if not any(set(c) < set(d) for d in cliques)}
+    assert {tuple(sorted(c)) for c in graph.maximal_cliques(adjacency)} == expected
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_min_weight_clique(seed):
+    adjacency = random_graph(24, 0.6, seed)
+    weights = sorted(Random(seed).randrange(100) for _ in range(24))
+    for k in (2, 4, 6):
+        cliques = list(graph.iter_cliques(adjacency, k))
+        best = graph.min_weight_clique(adjacency, k, weights)
+        assert sum(weights[v] for v in best) == min(sum(weights[v] for v in c) for c in cliques)
+        assert is_clique(adjacency, best)
+    assert graph.min_weight_clique(adjacency, 25, weights) is None
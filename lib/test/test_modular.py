@@ -0,0 +1,62 @@
+from math import gcd
+
+import lib.modular as modular
+from lib.prime import is_prime
+import pytest
+
+
+########################
+# Tests
+########################
+
+def test_modinv():
+    for m in (7, 10, 97, 2**61 - 1):
+        for a in range(1, 50):
+            if gcd(a, m) == 1:
+                assert a * modular.modinv(a, m) % m == 1, f"Incorrect inverse of {a} mod {m}"
+    with pytest.raises(ValueError):
+        modular.modinv(6, 9)
+
+
+def test_crt():
+    moduli = (3, 5, 7, 11, 10**9 + 7)
+    for x in (0, 1, 23, 1_000, 10**12 + 5):
+        assert modular.crt([x % m for m in moduli], moduli) == x
+    with pytest.raises(ValueError):
+        modular.crt((1, 2), (4, 6))
+
+
+def test_multiplicative_order():
+    """Compare against the length of the recurring cycle of 1/d in base 10, as in problem 26."""
+    assert modular.multiplicative_order(10, 7) == 6
+    assert modular.multiplicative_order(10, 983) == 982
+    for n in range(2, 200):
+        for a in (2, 3, 10):
+            if gcd(a, n) == 1:
+                expected = next(k for k in range(1, n + 1) if pow(a, k, n) == 1)
+                assert modular.multiplicative_order(a, n) == expected, f"Incorrect order of {a} mod {n}"
+
+
+def test_primitive_root():
+    assert [modular.primitive_root(n) for n in (2, 3, 4, 5, 7, 9, 18, 23, 41)] == [1, 2, 3, 2, 3, 2, 5, 5, 6]
+    for n in (8, 12, 15, 21, 100):
+        assert modular.primitive_root(n) is None, f"No primitive root exists modulo {n}"
+
+
+def test_sqrt_mod():
+    for p in filter(is_prime, range(3, 500)):
+        residues = {x * x % p for x in range(p)}
+        for a in range(p):
+            r = modular.sqrt_mod(a, p)
+            if a in residues:
+                assert r * r % p == a, f"Incorrect square root of {a} mod {p}"
+            else:
+                assert r is None, f"{a} is not a quadratic residue mod {p}"
+
+
+def test_discrete_log():
+    assert modular.discrete_log(3, 13, 17) == 4
+    assert modular.discrete_log(2, 3, 7) is None
+    p = 10**9 + 7
+    for k in (0, 1, 12_345, 999_999_999):
+        assert modular.discrete_log(5, pow(5, k, p), p) == k
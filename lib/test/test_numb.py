@@ -0,0 +1,164 @@
+from collections import Counter
+from itertools import permutations
+import math
+from random import Random
+
+import lib.numb as numb
+import numpy as np
+import pytest
+
+
+########################
+# Test data
+########################
+
+rng = Random(0)
+SAMPLE_VALUES = [0, 1, 9, 10, 100, 2**63, 2**64 - 1, 10**19, 10**19 + 1] + [
+    rng.randrange(10**rng.randrange(1, 20)) for _ in range(500)
+]
+
+
+def to_digits(n, base):
+    digits = []
+    while True:
+        n, d = divmod(n, base)
+        digits.append(d)
+        if not n:
+            return digits
+
+
+########################
+# Tests
+########################
+
+@pytest.mark.parametrize("base", (2, 3, 7, 10, 12))
+def test_digit_signature(base):
+    for m in SAMPLE_VALUES[:20]:
+        for n in SAMPLE_VALUES:
+            same = Counter(to_digits(m, base)) == Counter(to_digits(n, base))
+            assert (numb.digit_signature(m, base) == numb.digit_signature(n, base)) == same, f"Failed for {m}, {n}"
+
+    values = np.array(SAMPLE_VALUES, dtype=np.uint64)
+    assert numb.digit_signatures(values, base).tolist() == [numb.digit_signature(n, base) for n in SAMPLE_VALUES]
+
+
+def test_large_digit_signature():
+    # Too many repeated digits for the packed counts, so signatures fall back to tuples
+    n = int('1' * 40 + '2' * 3)
+    assert numb.digit_signature(n) == numb.digit_signature(int('2' * 3 + '1' * 40))
+    assert numb.digit_signature(n) != numb.digit_signature(int('1' * 41 + '2' * 2))
+    assert numb.digit_signature(n) != numb.digit_signature(int('1' * 8 + '2' * 3))
+    with pytest.raises(ValueError):
+        numb.digit_signatures([1, 2, 3], base=16)
+
+
+def test_permutations():
+    assert numb.is_permutation(87109, 79180)
+    assert not numb.is_permutation(100, 10)
+    assert numb.is_permutation(0b1011, 0b1110, base=2)
+    assert numb.same_digits(125874, '251748')
+    assert numb.same_digits(1003, [3, 0, 1, 0])
+    assert not numb.same_digits(1003, '031')
+
+
+@pytest.mark.parametrize("items", ([], [5], [1, 2, 3], list(range(6)), 'aabc', [0, 0, 1, 1, 2], 'mississi'))
+def test_multiset_permutations(items):
+    expected = sorted(set(permutations(items)))
+    assert list(numb.multiset_permutations(items)) == expected
+    assert numb.count_permutations(items) == len(expected)
+    for i, seq in enumerate(expected):
+        assert numb.rank_permutation(seq) == i
+        assert numb.unrank_permutation(items, i) == seq
+    assert list(numb.multiset_permutations(items, start=expected[-1])) == expected[-1:]
+    with pytest.raises(ValueError):
+        numb.unrank_permutation(items, len(expected))
+
+
+def test_perm():
+    assert ''.join(map(str, numb.unrank_permutation(range(10), 999_999))) == '2783915460'
+    assert numb.count_permutations('0123456789' * 3) == math.factorial(30) // math.factorial(3)**10
+    for n in (0, 7, 1000, 1123, 10203):
+        expected = {int(''.join(p)) for p in permutations(str(n))}
+        assert list(numb.perm(n, preserve_length=False)) == sorted(expected)
+        assert list(numb.perm(n)) == sorted(m for m in expected if len(str(m)) == len(str(n)))
+
+
+@pytest.mark.parametrize("base", (2, 3, 10, 16))
+def test_digit_kernels(base):
+    values = np.array(SAMPLE_VALUES, dtype=np.uint64)
+    digits = [to_digits(n, base) for n in SAMPLE_VALUES]
+    assert numb.digit_lengths(values, base).tolist() == [len(d) for d in digits]
+    assert numb.digit_sums(values, base).tolist() == [sum(d) for d in digits]
+    assert numb.digit_power_sums(values, 3, base).tolist() == [sum(x**3 for x in d) for d in digits]
+    assert numb.digit_sums(values, base, weights=range(1, base + 1)).tolist() == [sum(d) + len(d) for d in digits]
+
+    reversals = [sum(x * base**i for i, x in enumerate(reversed(d))) for d in digits]
+    assert numb.reversals(values, base).tolist() == [r % 2**64 for r in reversals]
+    assert numb.palindrome_mask(values, base).tolist() == [d == d[::-1] for d in digits]
+
+    length = max(map(len, digits))
+    assert numb.digit_arrays(values, base).tolist() == [[0] * (length - len(d)) + d[::-1] for d in digits]
+    assert numb.digit_arrays(values[:3], base, length=2).tolist() == [[0, 0], [0, 1], [9 // base % base, 9 % base]]
+
+
+def test_decimal_digit_kernels():
+    values = np.arange(100_000)
+    assert numb.digit_sums(values).tolist() == [sum(map(int, str(n))) for n in range(100_000)]
+    assert numb.reversals(values).tolist() == [int(numb.reverse(n)) for n in range(100_000)]
+    assert np.flatnonzero(numb.palindrome_mask(values)).tolist() == [n for n in range(100_000) if numb.is_palindrome(n)]
+
+
+@pytest.mark.parametrize("base", (2, 3, 10, 16, 36))
+def test_num_digits(base):
+    assert numb.num_digits(0, base) == 1
+    for k in range(1, 400):
+        power = base**k
+        assert numb.num_digits(power - 1, base) == k
+        assert numb.num_digits(power, base) == numb.num_digits(power + 1, base) == k + 1
+    for n in SAMPLE_VALUES + [rng.getrandbits(bits) for bits in range(1, 5_000, 7)]:
+        assert numb.num_digits(n, base) == len(to_digits(n, base))
+    for n in (np.int64(base**5), np.uint64(2**64 - 1), np.int32(base - 1), float(base**3), base**3 - 0.5):
+        assert numb.num_digits(n, base) == len(to_digits(int(n), base))
+
+
+def test_num_digits_large():
+    # Beyond the range of floating point precision, near powers of 10
+    for k in (10_000, 123_456):
+        assert numb.num_digits(10**k - 1) == k
+        assert numb.num_digits(10**k) == k + 1
+    assert numb.num_digits(2**300_000) == 90_309
+
+
+def to_base_reference(n, base):
+    return '-' * (n < 0) + ''.join(numb.BASE_DIGITS[d] for d in reversed(to_digits(abs(n), base)))
+
+
+@pytest.mark.parametrize("base", (2, 3, 4, 7, 8, 10, 16, 32, 36))
+def test_to_base(base):
+    values = [0, 1, base - 1, base, base**40 - 1, base**40, -base**3 - 1] + SAMPLE_VALUES[:50] + [
+        rng.getrandbits(bits) for bits in (200, 1_000, 5_000, 20_000)
+    ]
+    for n in values:
+        assert numb.to_base(n, base) == numb.to_str(n, base) == to_base_reference(n, base)
+        if n >= 0:
+            assert list(numb.digits_iter(n, base)) == to_digits(n, base)[::-1]
+    with pytest.raises(ValueError):
+        numb.to_base(10, 37)
+
+
+def test_to_base_large():
+    # Beyond the default limit on digits for converting ints with str()
+    n = 3**100_000 * 10**500
+    digits = numb.to_base(n)
+    assert len(digits) == numb.num_digits(n)
+    assert digits.endswith('1' + '0' * 500)
+    assert int(digits[:1_000]) == n // 10**(len(digits) - 1_000)
+    assert sum(numb.digits_iter(n)) == sum(map(int, digits))
+
+    # Several chunks of digits in other bases, with runs of zeros across chunk boundaries
+    for base in (3, 7, 36):
+        k = 3 * numb.BASE_CHUNK_DIGITS
+        n = 2 * base**k + base**(k // 2 + 1) + 2
+        expected = '2' + '0' * (k // 2 - 2) + '1' + '0' * (k // 2) + '2'
+        assert numb.to_base(n, base) == expected
+        assert list(numb.digits_iter(n, base)) == [int(c) for c in expected]
@@ -1,23 +1,22 @@
-from functools import update_wrapper
+from concurrent.futures import ProcessPoolExecutor
+from itertools import permutations
+
+from lib.cache import clear_all_caches
 import lib.prime as prime
+import numpy as np
 import pytest
 
 
 # Pytest fixtures
 @pytest.fixture()
 def clear_prime_cache():
-    """Clear module-level prime caching in prime.py before executing a test."""
+    """Clear module-level prime caching in prime.py, and all memoized results, before executing a test."""
     print("\nClearing prime cache")
     prime.clear_prime_cache()
+    clear_all_caches()
     yield
 
 
-# Clean up lru_cache wrappers so that introspection works during test reporting
-update_wrapper(prime.lru_cache, prime.prime_factors)
-update_wrapper(prime.lru_cache, prime.prime_factors_precomputed)
-update_wrapper(prime.lru_cache, prime.sum_divisors)
-
-
 ########################
 # Test data
 ########################
@@ -85,13 +84,13 @@ def test_is_prime_composite(clear_prime_cache):
 def test_is_prime_no_cache(clear_prime_cache):
     for p in primes:
         assert prime.is_prime(p, cache_primes=False), "False negative for primality test with :cache_primes:=False (p={})".format(p)
-        assert prime.CACHED_PRIMES_L == [2], "Erroneous cache generation during primality test"
+        assert prime.CACHED_PRIMES[:] == [2], "Erroneous cache generation during primality test"
 
 
 def test_is_prime_no_cache_composite(clear_prime_cache):
     for c in filter(lambda x: x not in primes, range(primes[-1])):
         assert not prime.is_prime(c, cache_primes=False), "False positive for primality test with :cache_primes:=False (c={})".format(c)
-        assert prime.CACHED_PRIMES_L == [2], "Erroneous cache generation during primality test"
+        assert prime.CACHED_PRIMES[:] == [2], "Erroneous cache generation during primality test"
 
 
 def test_primes(clear_prime_cache):
@@ -121,10 +120,378 @@ def test_primes_reverse(clear_prime_cache):
     for step_size in range(3, 15):
         generated = list()
         for i, p in enumerate(prime.primes(step=step_size, reverse=True)):
-            if i >= 110:
+            if i >= 100 + step_size:
                 # NOTE: This test must retrieve a extra results since the iteration is not in numerical order.
-                # Since the largest step_size is only 15 we just retrieve a few and then slice them out.
+                # Finishing the step that contains the 100th prime is enough, so we retrieve a step more and then
+                # slice them out.
                 break
             generated.append(p)
 
         assert sorted(generated)[:100] == primes, "Failed prime generator with :reverse:=True. (:step_size:={})".format(step_size)
+
+
+def test_sieve_primes_prime_count(clear_prime_cache):
+    """Compare sieve results against known values of the prime-counting function."""
+    assert len(prime.sieve_primes(max_prime=10**5)) == 9592
+    assert len(prime.sieve_primes(max_prime=10**6)) == 78498
+    assert prime.sieve_primes(num_primes=10_001)[-1] == 104743
+
+
+def test_prime_cache_slices(clear_prime_cache):
+    """Slices of the cache are lists, and views are arrays over the same primes, at any position in the cache."""
+    prime.sieve_primes(max_prime=primes[-1])
+    assert prime.CACHED_PRIMES[10:20] == primes[10:20]
+    assert prime.CACHED_PRIMES[::-7] == primes[::-7]
+    assert prime.CACHED_PRIMES[95:200] == primes[95:]
+    assert prime.CACHED_PRIMES.view(20, start=10).tolist() == primes[10:20]
+    assert prime.CACHED_PRIMES.available(1_000) == 100
+
+    # Negative bounds count from the end of the cache, wherever earlier slices stopped
+    prime.clear_prime_cache()
+    prime.sieve_primes(max_prime=100)
+    cached = primes[:len(prime.CACHED_PRIMES)]  # The cache may extend somewhat beyond 100
+    prime.clear_prime_cache()
+    prime.sieve_primes(max_prime=100)
+    assert prime.CACHED_PRIMES[:-1] == cached[:-1]
+    assert prime.CACHED_PRIMES[-3:-1] == cached[-3:-1]
+    assert prime.CACHED_PRIMES[-3:] == cached[-3:]
+    assert prime.CACHED_PRIMES[::-1] == cached[::-1]
+
+    # Repeated slices are copies, so callers may modify them
+    prime.sieve_primes(num_primes=10).append(0)
+    assert prime.sieve_primes(num_primes=10) == primes[:10]
+
+
+def test_sieve_primes_segmented_extension(clear_prime_cache):
+    """Extending the cache across several segments must agree with a single sieve of the whole range."""
+    limit = 6 * prime.SEGMENT_SIZE + 1
+    expected = prime.sieve_primes(max_prime=limit)
+    prime.clear_prime_cache()
+    for max_prime in range(1, limit, limit // 7):
+        prime.sieve_primes(max_prime=max_prime)
+
+    assert prime.sieve_primes(max_prime=limit) == expected
+    assert prime.get_cached_primes(as_set=True) == set(expected)
+
+
+def test_prime_cache_membership():
+    """Check list-like access and bit-vector membership of a standalone cache against the first 100 primes."""
+    cache = prime.PrimeCache()
+    cache.extend(primes[-1] + 1)
+
+    assert cache[:100] == primes
+    assert cache[99] == primes[-1]
+    assert cache.pi(primes[-1]) == len(primes) == 100
+    for n in range(primes[-1] + 1):
+        assert (n in cache) == (n in primes), "Incorrect cache membership for {}".format(n)
+
+
+def test_prime_cache_contains(clear_prime_cache):
+    """Membership is False below 2 (including negative odd values), and holds for NumPy integers and integral floats."""
+    prime.sieve_primes(max_prime=100)
+    assert [n for n in range(-10, 101) if n in prime.CACHED_PRIMES] == primes[:25]
+    assert 7.0 in prime.CACHED_PRIMES and np.int64(97) in prime.CACHED_PRIMES
+    assert 7.5 not in prime.CACHED_PRIMES and 9.0 not in prime.CACHED_PRIMES
+
+
+def test_prime_cache_file(clear_prime_cache, tmp_path):
+    """Save the cache to disk, memory-map it back in, and extend the file in place."""
+    path = tmp_path / "primes.bin"
+    prime.sieve_primes(max_prime=primes[50])
+    prime.save_prime_cache(path)
+    saved_size = path.stat().st_size
+
+    prime.clear_prime_cache()
+    prime.load_prime_cache(path)
+    assert prime.is_prime(primes[50]) and not prime.is_prime(primes[50] - 2)
+    assert prime.sieve_primes(num_primes=50) == primes[:50]
+
+    prime.load_prime_cache(path, max_prime=primes[-1])
+    assert path.stat().st_size > saved_size
+    prime.clear_prime_cache()
+    prime.load_prime_cache(path)
+    assert prime.sieve_primes(max_prime=primes[-1]) == primes
+
+    path.write_bytes(b"not a prime cache")
+    with pytest.raises(ValueError):
+        prime.load_prime_cache(path)
+
+
+def test_prime_cache_file_beyond_32_bits(clear_prime_cache, tmp_path):
+    """Primes unpacked from a cache file with a limit beyond 2**32 must be stored as 64-bit integers."""
+    path = tmp_path / "primes.bin"
+    limit = (1 << 32) + 33
+    large_prime = (1 << 32) + 15
+    with open(path, 'wb') as f:
+        f.write(prime.PrimeCache._header.pack(prime.PrimeCache._magic, limit))
+        # Leave the file sparse, flagging only the one large prime
+        f.truncate(prime.PrimeCache._header.size + limit // 16)
+        k = large_prime >> 1
+        f.seek(prime.PrimeCache._header.size + (k >> 3))
+        f.write(bytes([1 << (k & 7)]))
+
+    prime.load_prime_cache(path)
+    assert large_prime in prime.CACHED_PRIMES
+    assert prime.CACHED_PRIMES[:3] == [2, large_prime]
+
+
+# Strong pseudoprimes to the first few prime bases, and Carmichael numbers
+pseudoprimes = [561, 41041, 1_373_653, 25_326_001, 3_215_031_751, 2_152_302_898_747, 3_474_749_660_383,
+                341_550_071_728_321, 3_825_123_056_546_413_051, 318_665_857_834_031_151_167_461]
+
+# Mersenne and other large primes
+large_primes = [2**31 - 1, 999_999_999_989, 2**61 - 1, 18_446_744_073_709_551_557, 2**89 - 1, 2**127 - 1]
+
+
+@pytest.mark.parametrize("test", (prime.miller_rabin, prime.baillie_psw), ids=("miller_rabin", "baillie_psw"))
+def test_probable_prime_tests(clear_prime_cache, test):
+    sieved = set(prime.sieve_primes(max_prime=10**5))
+    for n in range(10**5):
+        assert test(n) == (n in sieved), "Incorrect primality for {}".format(n)
+    for c in pseudoprimes:
+        assert not test(c), "False positive for pseudoprime {}".format(c)
+    for p in large_primes:
+        assert test(p), "False negative for large prime {}".format(p)
+
+
+def test_is_prime_numeric_types():
+    """NumPy integers and integral floats are tested as the equivalent int."""
+    for n in (np.int64(10**9 + 7), np.uint64(2**61 - 1), np.int32(97), 7.0, np.float64(97.0)):
+        assert prime.is_prime(n), "False negative for {!r}".format(n)
+    for n in (np.int64(7 * 142_857_143), np.uint64(2**61 + 1), 9.0, 7.5):
+        assert not prime.is_prime(n), "False positive for {!r}".format(n)
+
+
+def test_is_prime_cache_growth(clear_prime_cache):
+    """Only an explicit request should grow the prime cache during a primality test."""
+    for n in pseudoprimes + large_primes:
+        assert prime.is_prime(n) == (n in large_primes), "Incorrect primality for {}".format(n)
+    assert prime.CACHED_PRIMES[:] == [2], "Erroneous cache generation during primality test"
+
+    assert prime.is_prime(primes[-1], cache_primes=True)
+    assert prime.CACHED_PRIMES[:100] == primes
+
+
+def test_smallest_prime_factors(clear_prime_cache):
+    """Check factorization by a smallest prime factor table against trial division, and its use by prime_factors."""
+    table = prime.SmallestPrimeFactors(10_000)
+    assert [table[n] for n in range(2, 12)] == [2, 3, 2, 5, 2, 7, 2, 3, 2, 11]
+    for n in range(2, 10_001):
+        assert table.factor(n) == prime.prime_factors_precomputed(n), "Incorrect factorization of {}".format(n)
+
+    try:
+        prime.sieve_smallest_factors(10_000)
+        assert prime.prime_factors(9_991) == {97: 1, 103: 1}
+        assert [prime.totient(n) for n in range(1, 11)] == [1, 1, 2, 2, 4, 2, 6, 4, 6, 4]
+        assert sorted(prime.generate_divisors(9_240)) == [d for d in range(1, 9_240) if 9_240 % d == 0]
+    finally:
+        prime.clear_spf_cache()
+
+
+def test_arithmetic_function_sieves(clear_prime_cache):
+    """Check each range sieve against factorization of each n."""
+    limit = 2_000
+    phis, sigmas, counts = prime.sieve_phi(limit), prime.sieve_sigma(limit), prime.sieve_num_divisors(limit)
+    mus, omegas = prime.sieve_mobius(limit), prime.sieve_omega(limit)
+
+    for n in range(1, limit + 1):
+        factors = prime.prime_factors(n)
+        divisors = [d for d in range(1, n + 1) if n % d == 0]
+        assert phis[n] == prime.totient(n), "Incorrect phi({})".format(n)
+        assert sigmas[n] == sum(divisors), "Incorrect sigma({})".format(n)
+        assert counts[n] == len(divisors), "Incorrect divisor count for {}".format(n)
+        assert mus[n] == (0 if any(k > 1 for k in factors.values()) else (-1) ** len(factors)), "Incorrect mu({})".format(n)
+        assert omegas[n] == len(factors), "Incorrect omega({})".format(n)
+
+
+# Large integers with known factorizations, for testing Pollard's rho
+large_factorizations = [
+    (2**64 + 1, {274_177: 1, 67_280_421_310_721: 1}),
+    (2**67 - 1, {193_707_721: 1, 761_838_257_287: 1}),
+    (4_000_000_064_000_000_252, {2: 2, 1_000_000_007: 1, 1_000_000_009: 1}),
+    (3_888_000_054_432_000_190_512, {2: 4, 3: 5, 1_000_000_007: 2}),
+]
+
+
+@pytest.mark.parametrize("n, factors", large_factorizations, ids=(str(f[0]) for f in large_factorizations))
+def test_prime_factors_large(n, factors):
+    assert prime.prime_factors(n) == factors
+    assert list(prime.prime_factors(n)) == sorted(factors), "Prime factors out of order"
+    assert prime.sum_divisors(n) == sum(prime.generate_divisors(n))
+
+
+@pytest.mark.parametrize("lo, hi", ((0, 100), (2, 3), (3, 3), (17, 542), (18, 541)))
+def test_primes_between(lo, hi):
+    expected = [p for p in primes if lo <= p < hi]
+    assert list(prime.primes_between(lo, hi)) == expected
+    assert list(prime.primes_between(lo, hi, reverse=True)) == expected[::-1]
+    assert [p for p, _ in zip(prime.primes_between(lo), expected)] == expected
+
+
+def test_primes_between_segments(clear_prime_cache):
+    """Generate primes across segment boundaries, far from the range of the prime cache."""
+    lo, hi = 10**12, 10**12 + 3 * prime.SEGMENT_SIZE
+    generated = list(prime.primes_between(lo, hi))
+    assert generated == list(reversed(list(prime.primes_between(lo, hi, reverse=True))))
+    assert generated[:3] == [1_000_000_000_039, 1_000_000_000_061, 1_000_000_000_063]
+    assert all(map(prime.miller_rabin, generated))
+    assert len(generated) == sum(map(prime.miller_rabin, range(lo | 1, hi, 2)))
+    assert prime.CACHED_PRIMES.limit <= 2 * 10**6, "Cached more than the base primes"
+
+
+def test_prime_counting(clear_prime_cache):
+    for x in (0, 1, 2, 3, 10, 100, 540, 541, 542):
+        expected = [p for p in primes if p <= x]
+        assert prime.prime_pi(x) == len(expected), "Incorrect prime count up to {}".format(x)
+        assert prime.prime_sum(x) == sum(expected), "Incorrect prime sum up to {}".format(x)
+
+    assert prime.prime_pi(10**10) == 455_052_511
+    assert prime.prime_sum(2 * 10**6) == 142_913_828_922
+    assert prime.prime_sum(10**10) == 2_220_822_432_581_729_238
+
+
+def test_nth_prime(clear_prime_cache):
+    assert [prime.nth_prime(n) for n in range(1, 101)] == primes
+    assert prime.nth_prime(10**6) == 15_485_863
+    assert prime.nth_prime(10**8) == 2_038_074_743
+
+
+def test_sieve_primes_parallel(clear_prime_cache):
+    """Sieving in parallel processes must agree with sieving serially, including when extending the cache."""
+    limit = 20 * prime.SEGMENT_SIZE
+    expected = prime.sieve_primes(max_prime=limit)
+
+    prime.clear_prime_cache()
+    prime.sieve_primes(max_prime=limit // 10)
+    assert prime.sieve_primes(max_prime=limit, workers=2) == expected
+    assert all(p in prime.CACHED_PRIMES for p in expected[-100:])
+
+
+def _shared_cache_report(n):
+    """Report on the prime cache of a worker process, for :func test_share_prime_cache:."""
+    return prime.CACHED_PRIMES.limit, prime.is_prime(n), prime.sieve_primes(num_primes=100)
+
+
+def test_share_prime_cache(clear_prime_cache):
+    prime.sieve_primes(max_prime=10**5)
+    shm = prime.share_prime_cache()
+    try:
+        with ProcessPoolExecutor(max_workers=2, initializer=prime.attach_prime_cache, initargs=(shm.name,)) as executor:
+            reports = list(executor.map(_shared_cache_report, (99_991, 99_993)))
+    finally:
+        shm.close()
+        shm.unlink()
+
+    assert reports == [(prime.CACHED_PRIMES.limit, True, primes), (prime.CACHED_PRIMES.limit, False, primes)]
+
+
+def test_share_attached_prime_cache(clear_prime_cache):
+    """A cache attached to shared memory can be shared again, as by a worker process."""
+    prime.sieve_primes(max_prime=10**5)
+    attached, reattached = prime.PrimeCache(), prime.PrimeCache()
+    blocks = [prime.share_prime_cache()]
+    try:
+        attached.attach(blocks[0])
+        blocks.append(attached.share())
+        reattached.attach(blocks[1])
+        assert reattached.limit == prime.CACHED_PRIMES.limit
+        assert reattached[:] == prime.CACHED_PRIMES[:]
+        assert 99_991 in reattached and 99_993 not in reattached
+    finally:
+        attached.clear()
+        reattached.clear()
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+
+
+@pytest.mark.parametrize("n", (1, 2, 28, 1_024, 720_720, 9_699_690))
+def test_iter_divisors(n):
+    expected = [d for d in range(1, n + 1) if n % d == 0]
+    assert list(prime.iter_divisors(n, ascending=True)) == expected
+    assert sorted(prime.iter_divisors(prime.prime_factors(n))) == expected
+    assert prime.num_divisors(n) == len(expected)
+    assert sorted(prime.generate_divisors(n)) == expected[:-1]
+
+    for upper_bound in (0, 1, 10, n // 3):
+        bounded = [d for d in expected if d <= upper_bound]
+        assert list(prime.iter_divisors(n, upper_bound=upper_bound, ascending=True)) == bounded
+        assert prime.num_divisors(n, upper_bound=upper_bound) == len(bounded)
+
+
+def test_gcd_batches():
+    xs, ys = list(range(1, 200)), list(range(400, 201, -1))
+    assert prime.gcd_many(xs, ys).tolist() == [prime.gcd(x, y) for x, y in zip(xs, ys)]
+    assert prime.gcd_many(xs, 12).tolist() == [prime.gcd(x, 12) for x in xs]
+    assert prime.coprime_mask(90, xs).tolist() == [prime.is_coprime(90, x) for x in xs]
+    assert prime.coprime_mask(9, range(1, 10)).sum() == prime.totient(9)
+
+
+@pytest.mark.parametrize("sieve_limit", (prime.PAIR_SIEVE_LIMIT, 0))
+def test_prime_pair_graph(sieve_limit):
+    vertices, adjacency = prime.prime_pair_graph(700, sieve_limit=sieve_limit)
+    assert vertices == [p for p in prime.sieve_primes(max_prime=699) if p not in (2, 5)]
+    for i, p in enumerate(vertices):
+        for j, q in enumerate(vertices[:i]):
+            paired = prime.is_prime(int(f"{p}{q}")) and prime.is_prime(int(f"{q}{p}"))
+            assert bool(adjacency[i] >> j & 1) == bool(adjacency[j] >> i & 1) == paired, f"Incorrect pair {p}, {q}"
+
+
+def test_truncatable_primes():
+    bound = 10**5
+    expected_right = [p for p in range(bound) if all(prime.is_prime(p // 10**k) for k in range(len(str(p))))]
+    expected_left = [p for p in range(bound) if '0' not in str(p)
+                     and all(prime.is_prime(p % 10**k) for k in range(1, len(str(p)) + 1))]
+    assert list(prime.right_truncatable_primes(5)) == expected_right
+    assert list(prime.left_truncatable_primes(5)) == expected_left
+
+    right = list(prime.right_truncatable_primes())
+    assert len(right) == 83 and right[-1] == 73_939_133
+    left = list(prime.left_truncatable_primes())
+    assert len(left) == 4260 and left[-1] == 357_686_312_646_216_567_629_137
+    assert sum(set(right) & set(left)) - 17 == 748_317
+
+
+def test_necklaces():
+    necklaces = list(prime._necklaces(4, 3))
+    assert necklaces == sorted(necklaces)
+    assert len(necklaces) == 24
+    assert all(n == min(n[k:] + n[:k] for k in range(4)) for n in necklaces)
+
+
+def test_digit_permuted_primes():
+    bound = 10**5
+    expected_circular = [p for p in range(bound) if all(
+        prime.is_prime(int(str(p)[k:] + str(p)[:k])) for k in range(len(str(p)))
+    )]
+    assert list(prime.circular_primes(5)) == expected_circular
+    assert len(list(prime.circular_primes(6))) == 55
+
+    expected_permutable = [p for p in expected_circular if all(
+        prime.is_prime(int(''.join(digits))) for digits in permutations(str(p))
+    )]
+    assert list(prime.permutable_primes(5)) == expected_permutable
+    assert list(prime.permutable_primes(8))[-2:] == [919, 991]
+
+
+@pytest.mark.parametrize("values", (
+    range(-10, 5_000),
+    np.arange(10**12, 10**12 + 3_000).reshape(50, 60),
+    np.arange(2**32 - 3_000, 2**32 + 3_000),
+    [c for c in pseudoprimes if c < 2**32] + list(range(10**9, 10**9 + 2_000)),
+    np.arange(2**64 - 1_000, 2**64 - 1, dtype=np.uint64),
+    [2**89 - 1, 2**89 + 1, 10**30, -7],
+    [97, 98, 99],
+    [],
+))
+def test_is_prime_many(values):
+    expected = np.vectorize(prime.is_prime, otypes=[bool])(np.array(list(values)).reshape(-1))
+    mask = prime.is_prime_many(values)
+    assert mask.dtype == bool
+    assert mask.reshape(-1).tolist() == expected.tolist()
+
+
+def test_is_prime_many_parallel():
+    prime.sieve_primes(max_prime=10**4)
+    values = np.arange(10**6, 10**6 + 3 * prime.PARALLEL_BATCH_SIZE * 10)
+    assert prime.is_prime_many(values, workers=2).tolist() == [prime.is_prime(n) for n in values]
@@ -7,7 +7,11 @@ By replacing the 3rd and 4th digits of 56**3 with the same digit, this 5-digit n
 
 Find the smallest prime which, by replacing part of the number (not necessarily adjacent digits) with the same digit, is part of an eight prime value family.
 """
-from lib.prime import is_prime, primes
+from itertools import accumulate, chain
+
+import numpy as np
+
+from lib.prime import is_prime_many, primes
 from lib.common import elapsed
 
 
@@ -37,13 +41,14 @@ def generate_families(p):
 
 
 def best_family(p):
-    best = 0
-    for fam in generate_families(p):
-        prime_count = len(list(filter(None, (is_prime(n) for n in fam))))
-        if prime_count > best:
-            best = prime_count
+    # Test all families of p in one batch, then count the primes in each
+    fams = generate_families(p)
+    if not fams:
+        return 0
 
-    return best
+    prime_mask = is_prime_many(list(chain.from_iterable(fams)))
+    offsets = list(accumulate((len(fam) for fam in fams[:-1]), initial=0))
+    return int(np.add.reduceat(prime_mask, offsets).max())
 
 
 limit = 8
@@ -7,7 +7,9 @@ Find the smallest positive integer, x, such that 2x, 3x, 4x, 5x, and 6x, contain
 """
 from itertools import count
 
-from lib.numb import same_digits
+import numpy as np
+
+from lib.numb import digit_signatures
 
 # Load last
 from lib.common import elapsed
@@ -20,11 +22,13 @@ def run():
     #   because of that fact that 6x must be within the same order of magnitude as x to have matching digits.
 
     # Start from 100, since 3 digits are required to give at least 6 permutations of those digits
+    # Each range is tested in one pass, comparing the digit signatures of all multiples at once
     for i in count(3):
-        for x in range(10**i, 10**(i + 1) // 6):
-            digits = str(x)
-            if all(map(lambda n: same_digits(n, digits), (x * j for j in range(1, 7)))):
-                return x
+        xs = np.arange(10**i, 10**(i + 1) // 6)
+        signatures = digit_signatures(xs)
+        permuted = np.logical_and.reduce([digit_signatures(xs * j) == signatures for j in range(2, 7)])
+        if permuted.any():
+            return int(xs[permuted.argmax()])
 
 
 print(f"Smallest integer with 6x permuted multiples: {run()}")
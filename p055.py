@@ -17,7 +17,9 @@ Surprisingly, there are palindromic numbers that are themselves Lychrel numbers;
 
 How many Lychrel numbers are there below ten-thousand?
 """
-from lib.numb import is_palindrome, reverse
+import numpy as np
+
+from lib.numb import is_palindrome, palindrome_mask, reverse, reversals
 from lib.common import elapsed
 
 limit = 10000
@@ -44,8 +46,23 @@ def is_lychrel(n, iter_limit=iter_limit):
     return True
 
 
+def count_lychrel(limit=limit, iter_limit=iter_limit):
+    """Return the number of Lychrel numbers below limit (up to iter_limit iterations)."""
+    # Iterate on all numbers at once while the sums fit in 64 bits (below 10**18, so that n + reverse(n) < 2**64),
+    #   keeping only those yet to reach a palindrome
+    values = np.arange(limit, dtype=np.uint64)
+    iterations = 0
+    while iterations < iter_limit and len(values) and values.max() < 10**18:
+        values = values + reversals(values)
+        values = values[~palindrome_mask(values)]
+        iterations += 1
+
+    # Then carry on with the remainder one at a time, with python ints
+    return sum(is_lychrel(n, iter_limit - iterations) for n in values.tolist())
+
+
 def run(limit=limit):
-    print(f"Found {sum(is_lychrel(n) for n in range(limit))} Lychrel numbers (up to {limit}, tested by {iter_limit} iterations)")
+    print(f"Found {count_lychrel(limit)} Lychrel numbers (up to {limit}, tested by {iter_limit} iterations)")
 
 
 run()
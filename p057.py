@@ -24,6 +24,7 @@ from itertools import accumulate, cycle, islice, takewhile
 from fractions import Fraction
 
 from lib.common import elapsed
+from lib.numb import num_digits
 
 limit = 1000
 
@@ -68,7 +69,7 @@ def expand_root_fraction():
 
 def brute_force(func):
     """Use one of the provided expand_root* generators to count digits and return solution."""
-    return sum(map(lambda q: len(str(q[0])) > len(str(q[1])), islice(func(), None, limit)))
+    return sum(map(lambda q: num_digits(q[0]) > num_digits(q[1]), islice(func(), None, limit)))
 
 
 def analytical_solution():
@@ -15,20 +15,17 @@ It is interesting to note that the odd squares lie along the bottom right diagon
 
 If one complete new layer is wrapped around the spiral above, a square spiral with side length 9 will be formed. If this process is continued, what is the side length of the square spiral for which the ratio of primes along both diagonals first falls below 10%?
 """
-from collections import deque
-from itertools import accumulate, count, takewhile
+from itertools import count
 
-from lib.prime import is_prime
+import numpy as np
+
+from lib.prime import is_prime_many
 
 from lib.common import elapsed
 
 ratio_limit = 10
 
 
-def is_prime_no_cache(n):
-    return is_prime(n, cache_primes=False)
-
-
 def side_len(n):
     """
     Return 1/4 of the number of terms in the nth iteration of the spiral square.
@@ -38,34 +35,35 @@ def side_len(n):
     return 2 * n
 
 
-def count_primes_at_level(n):
+def count_primes_at_levels(levels):
     """
-    Return number of primes on the four corners of the nth iteration of the spiral square.
+    Return array of the number of primes on the four corners of each of the given iterations of the spiral square.
 
     NOTE: n = 0 is the first level, with the single value 1 (which has 0 primes).
     Subsequent levels can have at most 3 primes, since one corner is a square number.
     """
-    side = side_len(n)
-    last_corner = (side + 1) ** 2  # Square number given in last corner at this level
-    other_corners = (last_corner - i * side for i in range(1, 4))
-    return sum(map(is_prime_no_cache, other_corners))
+    side = side_len(levels)[:, np.newaxis]
+    last_corner = (side + 1) ** 2  # Square number given in last corner at each level
+    other_corners = last_corner - side * np.arange(1, 4)
+    return is_prime_many(other_corners).sum(axis=1)
 
 
-def run():
+def run(block_size=1000):
     """Return target iteration count and side length of square after final iteration."""
-    # Generate cumulative count of primes starting from level 1,
+    # Test the corners of a block of levels at a time, keeping a cumulative count of primes starting from level 1,
     #   which has 8 elements, 4 corners, and 1 element in the interior (at level 0)
-    counter = accumulate(count_primes_at_level(n) for n in count(1))
-
-    # Generator will end one iteration before the ratio of primes to diagonal elements falls below 10%
-    evaluator = takewhile(lambda x: x[1] * 10 > x[0] * 4, enumerate(counter, 1))
-    iterations = deque(evaluator, maxlen=1)  # last element
-
-    # print(side_len(iterations.pop()[0]))
-
-    # Taking 1 more iteration would cause primes to fall below 10% of diagonal elements, which is what we want
-    target_iteration = iterations.pop()[0] + 1
-    return target_iteration, side_len(target_iteration) + 1
+    prime_count = 0
+    for start in count(1, block_size):
+        levels = np.arange(start, start + block_size)
+        prime_counts = prime_count + np.cumsum(count_primes_at_levels(levels))
+
+        # Ratio of primes to diagonal elements falls below the limit at the first level with too few primes
+        below_limit = np.flatnonzero(prime_counts * 100 < ratio_limit * (4 * levels + 1))
+        if len(below_limit):
+            target_iteration = int(levels[below_limit[0]])
+            return target_iteration, side_len(target_iteration) + 1
+
+        prime_count = prime_counts[-1]
 
 
 target_iter, target_side_len = run()
@@ -5,11 +5,12 @@ The cube, 41063625 (345^3), can be permuted to produce two other cubes: 56623104
 
 Find the smallest cube for which exactly five permutations of its digits are cube.
 """
-from collections import defaultdict
 from itertools import count
 from math import ceil, factorial
 
-from lib.numb import same_digits
+import numpy as np
+
+from lib.numb import digit_signature, digit_signatures
 
 from lib.common import elapsed, split_timer
 
@@ -24,10 +25,6 @@ def get_start_order(target=target):
     return next(filter(lambda x: x[1] >= target, ((i, factorial(i)) for i in count(1))))[0]
 
 
-def sorted_digits(n):
-    return tuple(sorted(str(n)))
-
-
 #  ~6s
 def solve_w_set_manipulation(target=target):
     # Cubes will be checked in chunks by limiting the domain of f(x) = x^(1/3) to a given order of magnitude.
@@ -45,10 +42,10 @@ def solve_w_set_manipulation(target=target):
         while cubes:
             # Remove a random element
             c = cubes.pop()
-            c_digits = str(c)
+            c_signature = digit_signature(c)
 
             # And then remove permutations of that element
-            c_perms = [p for p in cubes if same_digits(p, c_digits)]
+            c_perms = [p for p in cubes if digit_signature(p) == c_signature]
             cubes.difference_update(c_perms)
 
             # If the set length has changed by exactly our target amount then we're done
@@ -62,7 +59,7 @@ def solve_w_set_manipulation(target=target):
 
 #  ~0.0218s
 def solve_w_counter(target=target):
-    """Much faster than solve_w_set_manipulation, this simply keys the cubes off their sorted digits so they can be counted quickly."""
+    """Much faster than solve_w_set_manipulation, this simply keys the cubes off their digit signatures so they can be counted quickly."""
     # Cubes will be checked in chunks by limiting the domain of f(x) = x^(1/3) to a given order of magnitude.
     # This allows precomputation of all cubes in a given range of permutations.
     order = get_start_order()
@@ -71,19 +68,16 @@ def solve_w_counter(target=target):
     for i in count(order):
         stop = ceil(10**(i / 3))
 
-        cube_gen = (k**3 for k in range(start, stop))
-        cubes = defaultdict(list)
+        cubes = np.arange(start, stop, dtype=np.int64) ** 3
 
-        # Store cubes in a dict keyed by the sorted digits
-        for c in cube_gen:
-            cubes[sorted_digits(c)].append(c)
+        # Group cubes by their digit signatures, noting the first (smallest) cube of each group
+        signatures, first, counts = np.unique(digit_signatures(cubes), return_index=True, return_counts=True)
 
         split_timer()
         print(f"Checking {len(cubes)} cubes between {start:,}^3 = {start**3:,} and {stop:,}^3 = {stop**3:,}")
 
-        for c, v in cubes.items():
-            if len(v) == target:
-                return min(v)
+        if (counts == target).any():
+            return int(cubes[first[counts == target].min()])
 
         start = stop
 
@@ -10,9 +10,11 @@ Find the value of n, 1 < n < 10^7, for which phi(n) is a permutation of n and th
 """
 from math import prod
 
+import numpy as np
+
 from lib.common import elapsed
-from lib.numb import is_permutation
-from lib.prime import prime_factors, sieve_primes, reduce_factorization
+from lib.numb import digit_signatures, is_permutation
+from lib.prime import prime_factors, sieve_phi, sieve_primes, reduce_factorization
 
 MAX_RANGE = 10**7
 
@@ -84,15 +86,18 @@ def sieve_phis(max_value: int = MAX_RANGE):
 
 
 def search_sieved_phis(max_value: int = MAX_RANGE):
-    best = None
-    phis = sieve_phis(max_value=max_value)
-    for n in range(2, max_value):
-        if is_permutation(n, phis[n]):
-            ratio = n / phis[n]
-            if not best or best[1] > ratio:
-                best = (n, ratio)
-
-    return best
+    phis = sieve_phi(max_value - 1)  # Vectorized version of sieve_phis()
+    ns = np.arange(max_value)
+
+    # Compare digit signatures of all n and phi(n) at once
+    permuted = digit_signatures(ns) == digit_signatures(phis)
+    permuted[:2] = False
+    if not permuted.any():
+        return
+
+    ratios = ns[permuted] / phis[permuted]
+    best = ratios.argmin()
+    return int(ns[permuted][best]), float(ratios[best])
 
 
 # n, ratio = depth_first_search()